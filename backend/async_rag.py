@@ -0,0 +1,174 @@
+import asyncio
+
+from ragas import SingleTurnSample
+from ragas.embeddings import embedding_factory
+from ragas.llms import llm_factory
+from ragas.metrics.base import MetricWithEmbeddings, MetricWithLLM
+from ragas.run_config import RunConfig
+
+import coordinator
+import llm_client
+import rag
+from rag import (
+    RAGAS_METRICS,
+    RAGAS_MODEL,
+    SYSTEM_MSG,
+    TOP_K,
+    build_query,
+    digest_freshness,
+    build_user_instructions,
+    fetch_chunks,
+    insert_report,
+    load_report_request,
+    mark_report_failed,
+    save_briefing,
+    save_ragas_scores,
+    select_contexts,
+)
+
+_index = None
+
+
+# ─── Client lifecycle ─────────────────────────────────────────────────────────
+
+
+async def startup():
+    """Create the shared async Pinecone client for this event loop.
+
+    OpenAI calls go through llm_client's pooled async client.
+    """
+    global _index
+    host = rag.pc.describe_index(rag.INDEX_NAME).host
+    _index = rag.pc.IndexAsyncio(host=host)
+
+
+async def shutdown():
+    global _index
+    if _index is not None:
+        await _index.close()
+    await llm_client.aclose()
+    _index = None
+
+
+# ─── Embedding & retrieval ────────────────────────────────────────────────────
+
+
+async def embed_text(text: str) -> list[float]:
+    return await llm_client.aembed(text)
+
+
+async def retrieve_contexts(
+    prompt: str, projects: list[str]
+) -> tuple[list[tuple[str, str, float]], list[str]]:
+    """(digests used, contexts) for a briefing; see rag.select_contexts."""
+    query_emb = await embed_text(prompt)
+    query_resp = await _index.query(**build_query(query_emb, projects, TOP_K))
+    ids = [match["id"] for match in query_resp["matches"]]
+    chunks = await asyncio.to_thread(fetch_chunks, ids)
+    return await asyncio.to_thread(select_contexts, projects, chunks)
+
+
+# ─── RAGAS evaluation ────────────────────────────────────────────────────────
+
+_ragas_ready = False
+
+
+def _init_ragas_metrics():
+    """Bind the shared RAGAS metrics to async-capable LLM / embedding wrappers."""
+    global _ragas_ready
+    if _ragas_ready:
+        return
+    run_config = RunConfig()
+    llm = llm_factory(run_config=run_config)
+    embeddings = embedding_factory(run_config=run_config)
+    for metric in RAGAS_METRICS:
+        if isinstance(metric, MetricWithLLM):
+            metric.llm = llm
+        if isinstance(metric, MetricWithEmbeddings):
+            metric.embeddings = embeddings
+        metric.init(run_config)
+    _ragas_ready = True
+
+
+async def run_ragas_eval(
+    report_id: str,
+    user_instructions: str,
+    contexts: list[str],
+    result: str,
+):
+    try:
+        _init_ragas_metrics()
+        ragas_sample = SingleTurnSample(
+            user_input=user_instructions,
+            retrieved_contexts=contexts,
+            response=result,
+        )
+        await llm_client.areserve(
+            RAGAS_MODEL,
+            requests=len(RAGAS_METRICS),
+            tokens=llm_client.estimate_tokens(user_instructions + result)
+            * len(RAGAS_METRICS),
+        )
+        values = await asyncio.gather(
+            *(metric.single_turn_ascore(ragas_sample) for metric in RAGAS_METRICS)
+        )
+        scores = {metric.name: value for metric, value in zip(RAGAS_METRICS, values)}
+        await asyncio.to_thread(save_ragas_scores, report_id, scores)
+    except Exception as e:
+        print(f"Error running RAGAS evaluation: {e}")
+
+
+# ─── Briefing generation ──────────────────────────────────────────────────────
+
+
+async def generate_briefing(report_id: str):
+    """Async counterpart of rag.generate_briefing.
+
+    Network calls are awaited on the shared clients; SQLite and PDF rendering
+    are short blocking steps and run on the default thread pool.
+    """
+    request = await asyncio.to_thread(load_report_request, report_id)
+    if not request:
+        return
+    prompt, projects = request
+
+    try:
+        digests, contexts = await retrieve_contexts(prompt, projects)
+        context = "\n\n".join(contexts) if contexts else ""
+
+        user_instructions = build_user_instructions(prompt, context)
+
+        chat_resp = await llm_client.acreate_response(
+            coalesce=True,
+            model="gpt-4.1",
+            input=[SYSTEM_MSG, {"role": "user", "content": user_instructions}],
+            temperature=0.3,
+        )
+        result = chat_resp.output_text.strip()
+
+        await asyncio.to_thread(
+            save_briefing, report_id, result, digest_freshness(digests)
+        )
+        await run_ragas_eval(report_id, user_instructions, contexts, result)
+
+    except Exception as e:
+        await asyncio.to_thread(mark_report_failed, report_id, e)
+
+
+async def run_local_briefing(report_id: str, job_id: int):
+    """Multi-worker mode: generate on this worker's event loop as a claimed
+    job (coordinator.claim_local_job), so the leader only steps in if this
+    worker dies."""
+    try:
+        await generate_briefing(report_id)
+    finally:
+        await asyncio.to_thread(coordinator.finish_local_job, job_id)
+
+
+async def create_report(title: str, prompt: str, projects: list[str]) -> dict:
+    """Insert the report row; the caller schedules its generation."""
+    try:
+        return await asyncio.to_thread(insert_report, title, prompt, projects)
+    except Exception as e:
+        print(f"Error creating report: {e}")
+        return {"error": str(e)}
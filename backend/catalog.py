@@ -0,0 +1,276 @@
+import os
+import time
+import threading
+from typing import Optional
+
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+from watchdog.observers.polling import PollingObserver
+
+import rag
+from rag import BASE_DIR, conn, db_lock
+
+# ─── Configuration ─────────────────────────────────────────────────────────────
+
+UPLOAD_DIR = os.path.join(BASE_DIR, "uploads")
+
+DEBOUNCE = 1.0  # flush once the tree has been quiet this long...
+MAX_DELAY = 10.0  # ...or at the latest this long after the first change
+POLL_INTERVAL = 5.0  # polling fallback when inotify isn't available
+
+
+def _project_of(rel_path: str) -> str:
+    """Project name for indexing: the file's parent directory (as in
+    rag.index_all_files)."""
+    return os.path.basename(os.path.dirname(os.path.join(UPLOAD_DIR, rel_path)))
+
+
+# ─── Catalog (SQLite-backed, cached in memory) ────────────────────────────────
+
+
+def _bump_generation(cursor):
+    cursor.execute(
+        """
+        INSERT INTO catalog_meta (key, value) VALUES ('generation', 1)
+        ON CONFLICT(key) DO UPDATE SET value=value+1
+        """
+    )
+
+
+def _entry(rel_path: str) -> Optional[tuple]:
+    try:
+        st = os.stat(os.path.join(UPLOAD_DIR, rel_path))
+    except FileNotFoundError:
+        return None
+    is_dir = os.path.isdir(os.path.join(UPLOAD_DIR, rel_path))
+    return (rel_path, _project_of(rel_path), int(is_dir), st.st_mtime, st.st_size)
+
+
+def _walk(rel_dir: str = "") -> list[tuple]:
+    """Catalog entries for everything under rel_dir (inclusive, if not root)."""
+    entries = []
+    if rel_dir:
+        entry = _entry(rel_dir)
+        if entry:
+            entries.append(entry)
+    for root, dirs, files in os.walk(os.path.join(UPLOAD_DIR, rel_dir)):
+        for name in dirs + files:
+            entry = _entry(os.path.relpath(os.path.join(root, name), UPLOAD_DIR))
+            if entry:
+                entries.append(entry)
+    return entries
+
+
+def rescan():
+    """Rebuild the catalog from a full walk of the uploads tree."""
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    entries = _walk()
+    with db_lock:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM catalog")
+        cursor.executemany("INSERT INTO catalog VALUES (?, ?, ?, ?, ?)", entries)
+        _bump_generation(cursor)
+        conn.commit()
+        cursor.close()
+
+
+def apply_changes(changed: set[str], removed: set[str]) -> tuple[list, list]:
+    """Update the catalog for changed/removed paths (relative to uploads).
+
+    Returns the (files_added_or_modified, files_removed) relative paths,
+    with directories expanded to the files they contain.
+    """
+    upserts = {}
+    for rel_path in changed:
+        entry = _entry(rel_path)
+        if entry is None:
+            removed.add(rel_path)
+        elif entry[2]:
+            # A directory appeared (e.g. moved in): take everything inside
+            upserts.update((e[0], e) for e in _walk(rel_path))
+        else:
+            upserts[rel_path] = entry
+    removed -= set(upserts)
+
+    with db_lock:
+        cursor = conn.cursor()
+        removed_files = []
+        for rel_path in removed:
+            # The path itself, or everything under it if it was a directory
+            prefix = rel_path + os.sep
+            match = "rel_path=? OR substr(rel_path, 1, ?)=?"
+            params = (rel_path, len(prefix), prefix)
+            cursor.execute(
+                f"SELECT rel_path FROM catalog WHERE is_dir=0 AND ({match})", params
+            )
+            removed_files += [row[0] for row in cursor.fetchall()]
+            cursor.execute(f"DELETE FROM catalog WHERE {match}", params)
+        cursor.executemany(
+            "INSERT OR REPLACE INTO catalog VALUES (?, ?, ?, ?, ?)", upserts.values()
+        )
+        if upserts or removed:
+            _bump_generation(cursor)
+        conn.commit()
+        cursor.close()
+
+    changed_files = sorted(rel for rel, entry in upserts.items() if not entry[2])
+    return changed_files, removed_files
+
+
+class Catalog:
+    """In-memory copy of the catalog table, reloaded only when its generation
+    changes, so listing cost doesn't grow with the uploads tree.
+
+    Every worker reads it; only the node running the watcher writes it.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.generation = None
+        self.files: list[str] = []
+        self.projects: list[str] = []
+
+    def _refresh(self):
+        with db_lock:
+            cursor = conn.cursor()
+            cursor.execute("SELECT value FROM catalog_meta WHERE key='generation'")
+            row = cursor.fetchone()
+            generation = row[0] if row else 0
+            if generation == self.generation:
+                cursor.close()
+                return
+            cursor.execute("SELECT rel_path, is_dir FROM catalog ORDER BY rel_path")
+            rows = cursor.fetchall()
+            cursor.close()
+        self.files = [rel for rel, is_dir in rows if not is_dir]
+        self.projects = [rel for rel, is_dir in rows if is_dir and os.sep not in rel]
+        self.generation = generation
+
+    def listing(self) -> tuple[list[str], list[str], str]:
+        """(files, projects, etag) for the listing endpoints."""
+        with self.lock:
+            self._refresh()
+            return self.files, self.projects, f'"catalog-{self.generation}"'
+
+
+catalog = Catalog()
+
+
+def list_available_files() -> tuple[list[str], str]:
+    """All files under uploads (relative paths) and the catalog ETag."""
+    files, _, etag = catalog.listing()
+    return files, etag
+
+
+def list_projects() -> tuple[list[str], str]:
+    """Top-level directories under uploads and the catalog ETag."""
+    _, projects, etag = catalog.listing()
+    return projects, etag
+
+
+# ─── Watcher ──────────────────────────────────────────────────────────────────
+
+
+class UploadsWatcher(FileSystemEventHandler):
+    """Watches the uploads tree (inotify, or polling as a fallback), debounces
+    bursts of events and applies them: catalog update, incremental indexing of
+    added/modified files and vector deletion for removed ones."""
+
+    def __init__(self):
+        self.pending_changed: set[str] = set()
+        self.pending_removed: set[str] = set()
+        self.first_event = 0.0
+        self.last_event = 0.0
+        self.cond = threading.Condition()
+        self.observer = None
+        self.stopped = threading.Event()
+
+    def on_any_event(self, event):
+        if event.is_directory and event.event_type == "modified":
+            return  # Fires for every change inside the directory
+        if event.event_type not in ("created", "modified", "moved", "deleted"):
+            return
+        with self.cond:
+            if event.event_type == "deleted":
+                self._record(event.src_path, removed=True)
+            elif event.event_type == "moved":
+                self._record(event.src_path, removed=True)
+                self._record(event.dest_path, removed=False)
+            else:
+                self._record(event.src_path, removed=False)
+            now = time.monotonic()
+            if not self.first_event:
+                self.first_event = now
+            self.last_event = now
+            self.cond.notify()
+
+    def _record(self, path: str, removed: bool):
+        rel_path = os.path.relpath(os.fsdecode(path), UPLOAD_DIR)
+        if rel_path.startswith(".."):
+            return
+        if removed:
+            self.pending_changed.discard(rel_path)
+            self.pending_removed.add(rel_path)
+        else:
+            self.pending_removed.discard(rel_path)
+            self.pending_changed.add(rel_path)
+
+    def start(self):
+        if self.observer is not None:
+            return
+        rescan()
+        # Fresh event per run, so a previous flush loop can't be revived
+        self.stopped = threading.Event()
+        try:
+            self.observer = Observer()
+            self.observer.schedule(self, UPLOAD_DIR, recursive=True)
+            self.observer.start()
+        except OSError as e:
+            # e.g. inotify watch limit reached, or an unsupported filesystem
+            print(f"inotify unavailable ({e}), polling {UPLOAD_DIR}")
+            self.observer = PollingObserver(timeout=POLL_INTERVAL)
+            self.observer.schedule(self, UPLOAD_DIR, recursive=True)
+            self.observer.start()
+        threading.Thread(
+            target=self._flush_loop, args=(self.stopped,), daemon=True
+        ).start()
+
+    def stop(self):
+        self.stopped.set()
+        with self.cond:
+            self.cond.notify()
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer = None
+
+    def _flush_loop(self, stopped: threading.Event):
+        while not stopped.is_set():
+            with self.cond:
+                while not self.first_event and not stopped.is_set():
+                    self.cond.wait()
+                if stopped.is_set():
+                    return
+                now = time.monotonic()
+                deadline = min(self.last_event + DEBOUNCE, self.first_event + MAX_DELAY)
+                if now < deadline:
+                    self.cond.wait(deadline - now)
+                    continue
+                changed, removed = self.pending_changed, self.pending_removed
+                self.pending_changed, self.pending_removed = set(), set()
+                self.first_event = self.last_event = 0.0
+            try:
+                self._apply(changed, removed)
+            except Exception as e:
+                print(f"Error applying uploads changes: {e}")
+
+    def _apply(self, changed: set[str], removed: set[str]):
+        changed_files, removed_files = apply_changes(changed, removed)
+        for rel_path in removed_files:
+            rag.remove_indexed_file(os.path.join(UPLOAD_DIR, rel_path))
+        for rel_path in changed_files:
+            rag.index_file(os.path.join(UPLOAD_DIR, rel_path), _project_of(rel_path))
+        if changed_files or removed_files:
+            rag.refresh_stale_digests()
+
+
+watcher = UploadsWatcher()
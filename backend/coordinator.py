@@ -0,0 +1,255 @@
+import os
+import json
+import time
+import uuid
+import socket
+import threading
+from typing import Optional
+
+import rag
+from catalog import watcher
+from rag import conn, db_lock
+
+# ─── Configuration ─────────────────────────────────────────────────────────────
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+LEADER_LEASE = "leader"
+
+LEASE_TTL = 30  # seconds a leader keeps the lease without renewing it
+TICK = 2  # seconds between lease renewals / job polls
+JOB_TTL = 120  # seconds a claimed job survives without its leader renewing it
+MAX_ATTEMPTS = 3
+MAX_RUNNING_JOBS = int(os.getenv("LEADER_MAX_JOBS", "16"))
+
+
+# ─── Leader election ──────────────────────────────────────────────────────────
+
+
+def try_acquire_lease(name: str, holder: str, ttl: float) -> bool:
+    """Take or renew a lease; succeeds if it's free, expired, or already ours."""
+    now = time.time()
+    with db_lock:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(name) DO UPDATE
+            SET holder=excluded.holder, expires_at=excluded.expires_at
+            WHERE leases.holder=excluded.holder OR leases.expires_at < ?
+            """,
+            (name, holder, now + ttl, now),
+        )
+        acquired = cursor.rowcount == 1
+        conn.commit()
+        cursor.close()
+    return acquired
+
+
+def release_lease(name: str, holder: str):
+    with db_lock:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM leases WHERE name=? AND holder=?", (name, holder))
+        conn.commit()
+        cursor.close()
+
+
+# ─── Jobs ─────────────────────────────────────────────────────────────────────
+
+
+def claim_jobs(limit: int) -> list[tuple[int, str, dict]]:
+    """Claim up to `limit` queued jobs, or running ones whose claim expired
+    (their worker died)."""
+    now = time.time()
+    claimed = []
+    with db_lock:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT id, kind, payload FROM jobs
+            WHERE status IN ('queued', 'running')
+            AND (claimed_until IS NULL OR claimed_until < ?)
+            ORDER BY id LIMIT ?
+            """,
+            (now, limit),
+        )
+        for job_id, kind, payload in cursor.fetchall():
+            cursor.execute(
+                """
+                UPDATE jobs
+                SET status='running', claimed_by=?, claimed_until=?, attempts=attempts+1
+                WHERE id=? AND (claimed_until IS NULL OR claimed_until < ?)
+                """,
+                (WORKER_ID, now + JOB_TTL, job_id, now),
+            )
+            if cursor.rowcount == 1:
+                claimed.append((job_id, kind, json.loads(payload)))
+        conn.commit()
+        cursor.close()
+    return claimed
+
+
+def renew_jobs(job_ids: list[int]):
+    if not job_ids:
+        return
+    placeholders = ",".join("?" * len(job_ids))
+    with db_lock:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"UPDATE jobs SET claimed_until=? WHERE claimed_by=? AND id IN ({placeholders})",
+            (time.time() + JOB_TTL, WORKER_ID, *job_ids),
+        )
+        conn.commit()
+        cursor.close()
+
+
+def finish_job(job_id: int, error: Optional[str] = None):
+    with db_lock:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE jobs SET status=?, error=?, claimed_until=NULL WHERE id=?",
+            ("failed" if error else "done", error, job_id),
+        )
+        conn.commit()
+        cursor.close()
+
+
+def attempts_exhausted(job_id: int) -> bool:
+    with db_lock:
+        cursor = conn.cursor()
+        cursor.execute("SELECT attempts FROM jobs WHERE id=?", (job_id,))
+        row = cursor.fetchone()
+        cursor.close()
+    return bool(row) and row[0] > MAX_ATTEMPTS
+
+
+def run_job(kind: str, payload: dict):
+    if kind == "report":
+        rag.generate_briefing(payload["report_id"], [])
+    else:
+        raise ValueError(f"unknown job kind: {kind}")
+
+
+def claim_local_job(kind: str, payload: dict) -> int:
+    """Record a job this worker runs itself, already claimed by it. The claim
+    is renewed while the job runs; if the worker dies it lapses and the
+    leader re-runs the job."""
+    job_id = rag.enqueue_job(
+        kind, payload, claimed_by=WORKER_ID, claimed_until=time.time() + JOB_TTL
+    )
+    coordinator.local.add(job_id)
+    return job_id
+
+
+def finish_local_job(job_id: int, error: Optional[str] = None):
+    finish_job(job_id, error)
+    coordinator.local.discard(job_id)
+
+
+def give_up(job_id: int, kind: str, payload: dict):
+    """A job keeps getting orphaned (e.g. it crashes its worker): stop retrying."""
+    error = f"abandoned after {MAX_ATTEMPTS} attempts"
+    if kind == "report":
+        rag.mark_report_failed(payload["report_id"], Exception(error))
+    finish_job(job_id, error)
+
+
+# ─── Coordinator loop ─────────────────────────────────────────────────────────
+
+
+class Coordinator:
+    """Runs in every worker. The lease holder watches and indexes the uploads
+    tree and executes queued and orphaned jobs; other workers keep trying to
+    take over in case the leader dies.
+
+    Every worker generates the reports it accepts itself (local jobs), so
+    briefing throughput scales with the number of workers.
+    """
+
+    def __init__(self):
+        self.is_leader = False
+        self.running: dict[int, threading.Thread] = {}
+        self.local: set[int] = set()
+        self.stopped = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def run_local(self, kind: str, payload: dict):
+        """Run a job on this worker (in a thread), tracked in the jobs table."""
+        job_id = claim_local_job(kind, payload)
+        threading.Thread(
+            target=self._run, args=(job_id, kind, payload, True), daemon=True
+        ).start()
+
+    def stop(self):
+        self.stopped.set()
+        watcher.stop()
+        if self.is_leader:
+            release_lease(LEADER_LEASE, WORKER_ID)
+
+    def _loop(self):
+        while not self.stopped.is_set():
+            try:
+                self._tick()
+            except Exception as e:
+                print(f"Coordinator error: {e}")
+            self.stopped.wait(TICK)
+
+    def _tick(self):
+        was_leader = self.is_leader
+        self.is_leader = try_acquire_lease(LEADER_LEASE, WORKER_ID, LEASE_TTL)
+        if self.is_leader and not was_leader:
+            print(f"Worker {WORKER_ID} is now the leader")
+            threading.Thread(target=index_uploads, daemon=True).start()
+        elif was_leader and not self.is_leader:
+            # Running jobs finish and keep their claims renewed
+            print(f"Worker {WORKER_ID} lost leadership")
+            watcher.stop()
+
+        self.running = {
+            job_id: thread
+            for job_id, thread in self.running.items()
+            if thread.is_alive()
+        }
+        renew_jobs(list(self.running) + list(self.local))
+        if not self.is_leader:
+            return
+
+        for job_id, kind, payload in claim_jobs(MAX_RUNNING_JOBS - len(self.running)):
+            if attempts_exhausted(job_id):
+                give_up(job_id, kind, payload)
+                continue
+            thread = threading.Thread(
+                target=self._run, args=(job_id, kind, payload), daemon=True
+            )
+            self.running[job_id] = thread
+            thread.start()
+
+    def _run(self, job_id: int, kind: str, payload: dict, local: bool = False):
+        finish = finish_local_job if local else finish_job
+        try:
+            run_job(kind, payload)
+            finish(job_id)
+        except Exception as e:
+            print(f"Error running job {job_id} ({kind}): {e}")
+            finish(job_id, str(e))
+
+
+coordinator = Coordinator()
+
+
+def index_uploads():
+    """Start watching the uploads tree and index whatever changed since the
+    last run. Slow on a large corpus: always run it in a background thread."""
+    watcher.start()
+    rag.index_all_files()
+    print("Indexing complete")
+
+
+def start():
+    """Watch and index the uploads tree in the background (single worker) or
+    join leader election. Returns immediately."""
+    if rag.MULTI_WORKER:
+        coordinator.start()
+    else:
+        threading.Thread(target=index_uploads, daemon=True).start()
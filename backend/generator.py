@@ -1,17 +1,22 @@
+import io
 import os
 import json
 import csv
+import zipfile
+import random
+import argparse
+import textwrap
 import asyncio
-from openai import AsyncOpenAI
+from concurrent.futures import ProcessPoolExecutor
+import llm_client
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from docx import Document
-from datetime import datetime
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from tqdm import tqdm
 
 load_dotenv()
-api_key = os.getenv("OPENAI_API_KEY")
-client = AsyncOpenAI(api_key=api_key)
 
 # Configuración
 projects = [
@@ -37,6 +42,10 @@ projects = [
 num_files_per_project = 5
 output_dir = "backend/uploads"
 
+# Máximo de llamadas simultáneas a OpenAI en modo LLM (se crea en main()).
+llm_concurrency = 8
+llm_semaphore: asyncio.Semaphore | None = None
+
 
 async def generate_ai_content(prompt: str, model: str = "gpt-4.1") -> str:
     """Llama a OpenAI ChatCompletion para generar contenido asincrónicamente."""
@@ -44,14 +53,66 @@ async def generate_ai_content(prompt: str, model: str = "gpt-4.1") -> str:
         "role": "system",
         "content": "Eres un generador de datos sintéticos para documentación de proyectos de software. Genera contenido realista y detallado que incluya: actividades recientes, problemas/bloqueos, interacciones con otros equipos, KPIs específicos y tareas planificadas. Usa lenguaje técnico apropiado. Sin formato extra, solo contenido.",
     }
-    response = await client.responses.create(
-        model=model,
-        input=[system_message, {"role": "user", "content": prompt}],
-        temperature=0.7,
-    )
+    async with llm_semaphore:
+        response = await llm_client.acreate_response(
+            model=model,
+            input=[system_message, {"role": "user", "content": prompt}],
+            temperature=0.7,
+        )
     return response.output_text.strip()
 
 
+# ─── Escritura de archivos ────────────────────────────────────────────────────
+# Funciones sincrónicas, reutilizadas por el modo LLM (vía asyncio.to_thread)
+# y por los procesos del modo sintético.
+
+PDF_LINES_PER_PAGE = 50
+
+
+def write_pdf(full_path: str, content: str, invariant: bool = False):
+    c = canvas.Canvas(full_path, pagesize=letter, invariant=invariant)
+    lines = content.split("\n")
+    for start in range(0, max(len(lines), 1), PDF_LINES_PER_PAGE):
+        text_obj = c.beginText(40, 720)
+        for line in lines[start : start + PDF_LINES_PER_PAGE]:
+            text_obj.textLine(line)
+        c.drawText(text_obj)
+        c.showPage()
+    c.save()
+
+
+def write_docx(
+    full_path: str, heading: str, content: str, when: datetime | None = None
+):
+    doc = Document()
+    doc.add_heading(heading, level=1)
+    for para in content.split("\n\n"):
+        doc.add_paragraph(para)
+    if when is None:
+        doc.save(full_path)
+        return
+    # python-docx sella cada entrada del zip con la hora actual: se re-empaqueta
+    # con una fecha fija para que el archivo sea idéntico byte a byte.
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    with zipfile.ZipFile(buffer) as src, zipfile.ZipFile(full_path, "w") as dst:
+        for item in src.infolist():
+            info = zipfile.ZipInfo(item.filename, date_time=when.timetuple()[:6])
+            info.compress_type = item.compress_type
+            info.external_attr = item.external_attr
+            dst.writestr(info, src.read(item.filename))
+
+
+def write_json(full_path: str, messages: list):
+    with open(full_path, "w", encoding="utf-8") as f:
+        json.dump(messages, f, indent=2)
+
+
+def write_csv(full_path: str, content: str):
+    with open(full_path, "w", newline="", encoding="utf-8") as f:
+        f.write(content)
+
+
 async def create_pdf(project: str, i: int, timestamp: str, content: str) -> str:
     """Crea un archivo PDF con el contenido dado."""
     project_dir = os.path.join(output_dir, project)
@@ -60,12 +121,7 @@ async def create_pdf(project: str, i: int, timestamp: str, content: str) -> str:
     pdf_filename = f"{project}_summary_{i}_{timestamp}.pdf"
     full_path = os.path.join(project_dir, pdf_filename)
 
-    c = canvas.Canvas(full_path, pagesize=letter)
-    text_obj = c.beginText(40, 720)
-    for line in content.split("\n"):
-        text_obj.textLine(line)
-    c.drawText(text_obj)
-    c.save()
+    await asyncio.to_thread(write_pdf, full_path, content)
     return pdf_filename
 
 
@@ -77,24 +133,7 @@ async def create_docx(project: str, i: int, timestamp: str, content: str) -> str
     docx_filename = f"{project}_brief_{i}_{timestamp}.docx"
     full_path = os.path.join(project_dir, docx_filename)
 
-    def _create_docx():
-        doc = Document()
-        doc.add_heading(f"{project} Brief #{i}", level=1)
-        for para in content.split("\n\n"):
-            # Check if paragraph contains markdown headings or lists
-            if (
-                para.strip().startswith("#")
-                or para.strip().startswith("*")
-                or para.strip().startswith("-")
-            ):
-                # Add heading or list item directly
-                doc.add_paragraph(para)
-            else:
-                # Regular paragraph
-                doc.add_paragraph(para)
-        doc.save(full_path)
-
-    await asyncio.to_thread(_create_docx)
+    await asyncio.to_thread(write_docx, full_path, f"{project} Brief #{i}", content)
     return docx_filename
 
 
@@ -108,9 +147,7 @@ async def create_json(project: str, i: int, timestamp: str, content: str) -> str
 
     messages = json.loads(content)
 
-    await asyncio.to_thread(
-        lambda: json.dump(messages, open(full_path, "w", encoding="utf-8"), indent=2)
-    )
+    await asyncio.to_thread(write_json, full_path, messages)
     return json_filename
 
 
@@ -122,9 +159,7 @@ async def create_csv(project: str, i: int, timestamp: str, content: str) -> str:
     csv_filename = f"{project}_metrics_{i}_{timestamp}.csv"
     full_path = os.path.join(project_dir, csv_filename)
 
-    await asyncio.to_thread(
-        lambda: open(full_path, "w", newline="", encoding="utf-8").write(content)
-    )
+    await asyncio.to_thread(write_csv, full_path, content)
     return csv_filename
 
 
@@ -170,8 +205,175 @@ async def process_file_set(project: dict, i: int):
     )
 
 
-async def main():
+# ─── Modo sintético (sin LLM) ─────────────────────────────────────────────────
+# Genera un corpus reproducible a partir de plantillas y una semilla: el mismo
+# (seed, proyecto, índice) produce siempre los mismos archivos.
+
+SYNTH_AREAS = ["backend", "frontend", "infraestructura", "QA", "datos", "seguridad"]
+SYNTH_TECH = [
+    "Kubernetes",
+    "PostgreSQL",
+    "Redis",
+    "Kafka",
+    "React",
+    "FastAPI",
+    "Terraform",
+    "gRPC",
+]
+SYNTH_PEOPLE = [
+    "Lucía",
+    "Martín",
+    "Sofía",
+    "Joaquín",
+    "Valentina",
+    "Tomás",
+    "Camila",
+    "Nicolás",
+]
+SYNTH_TEAMS = ["Plataforma", "Producto", "Seguridad", "Data", "Soporte", "Mobile"]
+SYNTH_STATUS = ["activo", "en riesgo", "bloqueado", "en pausa"]
+SYNTH_METRICS = [
+    ("Entrega", "velocidad de sprint", (20, 60)),
+    ("Calidad", "bugs por release", (0, 25)),
+    ("Calidad", "cobertura de código", (40, 95)),
+    ("Entrega", "tiempo de ciclo (días)", (1, 15)),
+    ("Operación", "incidentes P1", (0, 5)),
+    ("Operación", "latencia p95 (ms)", (80, 900)),
+]
+SYNTH_TEMPLATES = [
+    "El equipo de {area} completó la migración de {tech} y redujo la latencia un {pct}%.",
+    "{person} reportó un bloqueo en {tech}: {area} depende de una respuesta del equipo de {team}.",
+    "Se acordó con {team} priorizar la integración con {tech} para el próximo sprint.",
+    "La cobertura de pruebas en {area} subió al {pct}% tras los cambios de {person}.",
+    "Se detectaron {num} incidentes relacionados con {tech}; {person} lidera el análisis.",
+    "{person} planificó la refactorización del módulo de {area} usando {tech}.",
+    "El KPI de tiempo de ciclo bajó a {num} días gracias a la automatización en {area}.",
+    "Reunión con {team}: se definieron criterios de aceptación para {tech}.",
+]
+
+
+def synthetic_sentence(rng: random.Random) -> str:
+    return rng.choice(SYNTH_TEMPLATES).format(
+        area=rng.choice(SYNTH_AREAS),
+        tech=rng.choice(SYNTH_TECH),
+        person=rng.choice(SYNTH_PEOPLE),
+        team=rng.choice(SYNTH_TEAMS),
+        pct=rng.randint(5, 95),
+        num=rng.randint(1, 12),
+    )
+
+
+def synthetic_text(rng: random.Random, words: int) -> str:
+    """Párrafos de oraciones de plantilla hasta sumar ~`words` palabras."""
+    paragraphs = []
+    count = 0
+    while count < words:
+        sentences = [synthetic_sentence(rng) for _ in range(rng.randint(3, 6))]
+        paragraph = " ".join(sentences)
+        count += len(paragraph.split())
+        paragraphs.append(textwrap.fill(paragraph, width=90))
+    return "\n\n".join(paragraphs)
+
+
+def synthetic_chat(rng: random.Random, when: datetime, n_messages: int) -> list:
+    messages = []
+    for _ in range(n_messages):
+        when += timedelta(minutes=rng.randint(1, 90))
+        message = {
+            "user": rng.choice(SYNTH_PEOPLE),
+            "text": f"@{rng.choice(SYNTH_PEOPLE)} {synthetic_sentence(rng)}",
+            "ts": when.isoformat(),
+        }
+        if rng.random() < 0.4:
+            message["reactions"] = rng.sample(
+                [":+1:", ":eyes:", ":rocket:", ":fire:"], 2
+            )
+        messages.append(message)
+    return messages
+
+
+def synthetic_metrics(rng: random.Random, when: datetime, n_rows: int) -> str:
+    rows = ["fecha,categoría,métrica,valor,tendencia,responsable"]
+    for _ in range(n_rows):
+        when += timedelta(days=rng.randint(0, 3))
+        category, metric, (low, high) = rng.choice(SYNTH_METRICS)
+        rows.append(
+            f"{when.date().isoformat()},{category},{metric},{rng.randint(low, high)},"
+            f"{rng.choice(['sube', 'baja', 'estable'])},{rng.choice(SYNTH_PEOPLE)}"
+        )
+    return "\n".join(rows) + "\n"
+
+
+def write_synthetic_set(job: tuple) -> int:
+    """Escribe los 4 archivos de un conjunto. Corre dentro del pool de procesos."""
+    out_dir, seed, project, i, words, n_messages, n_rows = job
+    rng = random.Random(f"{seed}:{project}:{i}")
+    when = datetime(2025, 1, 1) + timedelta(minutes=rng.randint(0, 525600))
+    timestamp = when.strftime("%Y%m%d%H%M%S")
+
+    project_dir = os.path.join(out_dir, project)
+    os.makedirs(project_dir, exist_ok=True)
+
+    status = rng.choice(SYNTH_STATUS)
+    summary = f"Resumen de {project} (estado: {status})\n\n" + synthetic_text(
+        rng, words
+    )
+    write_pdf(
+        os.path.join(project_dir, f"{project}_summary_{i}_{timestamp}.pdf"),
+        summary,
+        invariant=True,
+    )
+    write_docx(
+        os.path.join(project_dir, f"{project}_brief_{i}_{timestamp}.docx"),
+        f"{project} Brief #{i}",
+        synthetic_text(rng, words),
+        when,
+    )
+    write_json(
+        os.path.join(project_dir, f"{project}_chat_{i}_{timestamp}.json"),
+        synthetic_chat(rng, when, n_messages),
+    )
+    write_csv(
+        os.path.join(project_dir, f"{project}_metrics_{i}_{timestamp}.csv"),
+        synthetic_metrics(rng, when, n_rows),
+    )
+    return 4
+
+
+def run_synthetic(args):
+    """Genera N proyectos × M conjuntos de archivos sin llamar a OpenAI."""
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [
+        (
+            output_dir,
+            args.seed,
+            f"SYNTH_PROJECT_{p:04d}",
+            i,
+            args.words,
+            args.messages,
+            args.rows,
+        )
+        for p in range(1, args.projects + 1)
+        for i in range(1, args.files + 1)
+    ]
+    total = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        chunksize = max(1, len(jobs) // ((args.workers or os.cpu_count() or 1) * 16))
+        for written in tqdm(
+            pool.map(write_synthetic_set, jobs, chunksize=chunksize),
+            total=len(jobs),
+            desc="Generando conjuntos",
+        ):
+            total += written
+    print(
+        f"Completada la generación de {total} archivos en {os.path.abspath(output_dir)}"
+    )
+
+
+async def main(concurrency: int = llm_concurrency):
     """Punto de entrada principal del script."""
+    global llm_semaphore
+    llm_semaphore = asyncio.Semaphore(concurrency)
     os.makedirs(output_dir, exist_ok=True)
     print(
         f"Guardando todos los archivos generados en el directorio: {os.path.abspath(output_dir)}"
@@ -189,4 +391,55 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Generador de datos sintéticos.")
+    parser.add_argument(
+        "--mode",
+        choices=["llm", "synthetic"],
+        default="llm",
+        help="llm: contenido generado por OpenAI. synthetic: plantillas + semilla, sin red.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=llm_concurrency,
+        help="[llm] llamadas simultáneas a OpenAI",
+    )
+    parser.add_argument(
+        "--projects",
+        type=int,
+        default=len(projects),
+        help="[synthetic] cantidad de proyectos",
+    )
+    parser.add_argument(
+        "--files",
+        type=int,
+        default=num_files_per_project,
+        help="[synthetic] conjuntos (PDF/DOCX/JSON/CSV) por proyecto",
+    )
+    parser.add_argument(
+        "--words",
+        type=int,
+        default=300,
+        help="[synthetic] palabras aproximadas por PDF/DOCX",
+    )
+    parser.add_argument(
+        "--messages", type=int, default=10, help="[synthetic] mensajes por JSON"
+    )
+    parser.add_argument(
+        "--rows", type=int, default=10, help="[synthetic] filas por CSV"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="[synthetic] semilla del corpus"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="[synthetic] procesos (por defecto, uno por CPU)",
+    )
+    args = parser.parse_args()
+
+    if args.mode == "synthetic":
+        run_synthetic(args)
+    else:
+        asyncio.run(main(args.concurrency))
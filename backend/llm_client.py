@@ -0,0 +1,488 @@
+import os
+import json
+import time
+import queue
+import random
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+import httpx
+from dotenv import load_dotenv
+from openai import (
+    OpenAI,
+    AsyncOpenAI,
+    DefaultAsyncHttpxClient,
+    APIConnectionError,
+    APIStatusError,
+    APITimeoutError,
+    RateLimitError,
+)
+
+load_dotenv()
+
+# ─── Configuration ─────────────────────────────────────────────────────────────
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Per-model (requests/min, tokens/min). Override with OPENAI_RATE_LIMITS, e.g.
+# OPENAI_RATE_LIMITS='{"gpt-4.1": [500, 30000]}'. Unlisted models use DEFAULT.
+RATE_LIMITS = {
+    "text-embedding-3-small": (3000, 1_000_000),
+    "gpt-4.1": (500, 30_000),
+    "gpt-4.1-mini": (500, 200_000),
+    "gpt-4o-mini": (500, 200_000),
+}
+RATE_LIMITS.update(
+    {k: tuple(v) for k, v in json.loads(os.getenv("OPENAI_RATE_LIMITS", "{}")).items()}
+)
+DEFAULT_RATE_LIMIT = (500, 30_000)
+
+# Buckets are per process: with N workers (WEB_CONCURRENCY) each one gets 1/N
+# of the limits above, so together they stay within the account's budget.
+RATE_LIMIT_WORKERS = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+
+# Output tokens reserved per Responses call when max_output_tokens isn't set.
+DEFAULT_OUTPUT_RESERVE = 1000
+
+MAX_RETRIES = 6
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+# Embedding micro-batching: wait up to BATCH_WINDOW seconds for more texts
+# after the first one arrives, up to BATCH_MAX_SIZE texts per API call.
+BATCH_WINDOW = float(os.getenv("EMBED_BATCH_WINDOW", "0.01"))
+BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "256"))
+BATCH_WORKERS = 4
+
+# Upper bound on open sockets from the async client. In-flight requests above
+# this wait for a pooled connection instead of opening new ones.
+MAX_CONNECTIONS = int(os.getenv("ASYNC_MAX_CONNECTIONS", "200"))
+MAX_KEEPALIVE = int(os.getenv("ASYNC_MAX_KEEPALIVE", "50"))
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 chars/token) used only for rate limiting."""
+    return len(text) // 4 + 1
+
+
+# ─── Clients ──────────────────────────────────────────────────────────────────
+# Created lazily so importing this module never needs an API key. Retries are
+# handled here, so the SDK's own retries are disabled.
+
+_client: Optional[OpenAI] = None
+_async_client: Optional[AsyncOpenAI] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> OpenAI:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+        return _client
+
+
+def get_async_client() -> AsyncOpenAI:
+    """Shared async client with a pooled httpx transport (one event loop)."""
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            max_retries=0,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_KEEPALIVE,
+                )
+            ),
+        )
+    return _async_client
+
+
+async def aclose():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+    _async_client = None
+
+
+# ─── Statistics ───────────────────────────────────────────────────────────────
+
+
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.retries = 0
+        self.errors = 0
+        self.coalesced = 0
+        self.rate_limit_wait = 0.0
+        self.batches = 0
+        self.batched_texts = 0
+        self.max_batch_size = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+
+    def add(self, **deltas):
+        with self._lock:
+            for name, value in deltas.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def record_request(self, model: str):
+        with self._lock:
+            self.requests[model] = self.requests.get(model, 0) + 1
+
+    def record_batch(self, size: int, queue_waits: list[float]):
+        with self._lock:
+            self.batches += 1
+            self.batched_texts += size
+            self.max_batch_size = max(self.max_batch_size, size)
+            self.queue_wait_total += sum(queue_waits)
+            self.queue_wait_max = max([self.queue_wait_max, *queue_waits])
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": dict(self.requests),
+                "retries": self.retries,
+                "errors": self.errors,
+                "coalesced": self.coalesced,
+                "rateLimitWaitSeconds": round(self.rate_limit_wait, 3),
+                "embeddingBatches": self.batches,
+                "embeddingBatchSizeAvg": (
+                    self.batched_texts / self.batches if self.batches else 0
+                ),
+                "embeddingBatchSizeMax": self.max_batch_size,
+                "embeddingQueueWaitAvgMs": (
+                    1000 * self.queue_wait_total / self.batched_texts
+                    if self.batched_texts
+                    else 0
+                ),
+                "embeddingQueueWaitMaxMs": 1000 * self.queue_wait_max,
+            }
+
+
+stats = Stats()
+
+
+def get_stats() -> dict:
+    return stats.snapshot()
+
+
+# ─── Rate limiting ────────────────────────────────────────────────────────────
+
+
+class TokenBucket:
+    """Requests-per-minute and tokens-per-minute budget for one model."""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = float(rpm)
+        self.tokens = float(tpm)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def try_acquire(self, requests: int, tokens: int) -> float:
+        """Take the budget and return 0, or return the seconds to wait."""
+        # A single call larger than the whole budget would never fit
+        requests = min(requests, self.rpm)
+        tokens = min(tokens, self.tpm)
+        with self.lock:
+            now = time.monotonic()
+            elapsed = now - self.updated
+            self.updated = now
+            self.requests = min(self.rpm, self.requests + elapsed * self.rpm / 60)
+            self.tokens = min(self.tpm, self.tokens + elapsed * self.tpm / 60)
+            if self.requests >= requests and self.tokens >= tokens:
+                self.requests -= requests
+                self.tokens -= tokens
+                return 0.0
+            return max(
+                (requests - self.requests) * 60 / self.rpm,
+                (tokens - self.tokens) * 60 / self.tpm,
+            )
+
+
+_buckets: dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(model: str) -> TokenBucket:
+    with _buckets_lock:
+        if model not in _buckets:
+            rpm, tpm = RATE_LIMITS.get(model, DEFAULT_RATE_LIMIT)
+            _buckets[model] = TokenBucket(
+                max(1, rpm // RATE_LIMIT_WORKERS), max(1, tpm // RATE_LIMIT_WORKERS)
+            )
+        return _buckets[model]
+
+
+def reserve(model: str, requests: int = 1, tokens: int = 0):
+    """Block until `model` has budget for the given requests and tokens."""
+    bucket = get_bucket(model)
+    while (wait := bucket.try_acquire(requests, tokens)) > 0:
+        stats.add(rate_limit_wait=wait)
+        time.sleep(wait)
+
+
+async def areserve(model: str, requests: int = 1, tokens: int = 0):
+    bucket = get_bucket(model)
+    while (wait := bucket.try_acquire(requests, tokens)) > 0:
+        stats.add(rate_limit_wait=wait)
+        await asyncio.sleep(wait)
+
+
+# ─── Retries ──────────────────────────────────────────────────────────────────
+
+
+def _is_retryable(e: Exception) -> bool:
+    if isinstance(e, (RateLimitError, APIConnectionError, APITimeoutError)):
+        return True
+    return isinstance(e, APIStatusError) and e.status_code >= 500
+
+
+def _is_bad_request(e: Exception) -> bool:
+    """A non-retryable 4xx: the request itself was rejected."""
+    return (
+        isinstance(e, APIStatusError)
+        and 400 <= e.status_code < 500
+        and not isinstance(e, RateLimitError)
+    )
+
+
+def _backoff(attempt: int, e: Exception) -> float:
+    """Full-jitter exponential backoff, honouring Retry-After when present."""
+    retry_after = None
+    if isinstance(e, APIStatusError):
+        try:
+            retry_after = float(e.response.headers.get("retry-after"))
+        except (TypeError, ValueError):
+            pass
+    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+    return max(delay, retry_after or 0.0)
+
+
+def _call(model: str, tokens: int, fn: Callable):
+    for attempt in range(MAX_RETRIES + 1):
+        reserve(model, 1, tokens)
+        stats.record_request(model)
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == MAX_RETRIES or not _is_retryable(e):
+                stats.add(errors=1)
+                raise
+            stats.add(retries=1)
+            time.sleep(_backoff(attempt, e))
+
+
+async def _acall(model: str, tokens: int, fn: Callable):
+    for attempt in range(MAX_RETRIES + 1):
+        await areserve(model, 1, tokens)
+        stats.record_request(model)
+        try:
+            return await fn()
+        except Exception as e:
+            if attempt == MAX_RETRIES or not _is_retryable(e):
+                stats.add(errors=1)
+                raise
+            stats.add(retries=1)
+            await asyncio.sleep(_backoff(attempt, e))
+
+
+# ─── Request coalescing ───────────────────────────────────────────────────────
+
+_inflight: dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+_ainflight: dict[str, asyncio.Task] = {}
+
+
+def _coalesced(key: str, fn: Callable):
+    """Run fn once per key; concurrent callers with the same key share it."""
+    with _inflight_lock:
+        future = _inflight.get(key)
+        owner = future is None
+        if owner:
+            future = _inflight[key] = Future()
+        else:
+            stats.add(coalesced=1)
+    if owner:
+        try:
+            future.set_result(fn())
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with _inflight_lock:
+                del _inflight[key]
+    return future.result()
+
+
+async def _acoalesced(key: str, fn: Callable):
+    task = _ainflight.get(key)
+    if task is None:
+        task = _ainflight[key] = asyncio.ensure_future(fn())
+        task.add_done_callback(lambda _: _ainflight.pop(key, None))
+    else:
+        stats.add(coalesced=1)
+    # Shielded so one cancelled caller doesn't cancel the others' request
+    return await asyncio.shield(task)
+
+
+# ─── Embeddings (micro-batched) ───────────────────────────────────────────────
+
+
+class EmbeddingBatcher:
+    """Collects single-text embedding requests from many threads / coroutines
+    and sends them to OpenAI as one batched call per BATCH_WINDOW.
+
+    Identical texts already queued or in flight share one result.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self.queue: queue.Queue = queue.Queue()
+        self.inflight: dict[str, Future] = {}
+        self.lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(
+            max_workers=BATCH_WORKERS, thread_name_prefix="embed-batch"
+        )
+        self.thread: Optional[threading.Thread] = None
+
+    def submit(self, text: str) -> Future:
+        with self.lock:
+            future = self.inflight.get(text)
+            if future is not None:
+                stats.add(coalesced=1)
+                return future
+            future = self.inflight[text] = Future()
+            self.queue.put((text, future, time.monotonic()))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._collect, daemon=True)
+                self.thread.start()
+        return future
+
+    def _collect(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + BATCH_WINDOW
+            while len(batch) < BATCH_MAX_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self.pool.submit(self._dispatch, batch)
+
+    def _embed(self, texts: list[str]) -> list[list[float]]:
+        tokens = sum(estimate_tokens(text) for text in texts)
+        resp = _call(
+            self.model,
+            tokens,
+            lambda: get_client().embeddings.create(input=texts, model=self.model),
+        )
+        return [d.embedding for d in sorted(resp.data, key=lambda d: d.index)]
+
+    def _dispatch(self, batch: list):
+        now = time.monotonic()
+        stats.record_batch(len(batch), [now - queued for _, _, queued in batch])
+        texts = [text for text, _, _ in batch]
+        try:
+            embeddings = self._embed(texts)
+            for (_, future, _), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
+        except Exception as e:
+            if len(batch) > 1 and _is_bad_request(e):
+                # One invalid input (e.g. over the model's token limit) rejects
+                # the whole batch: retry one by one so only it fails
+                self._dispatch_each(batch)
+            else:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+        finally:
+            with self.lock:
+                for text in texts:
+                    self.inflight.pop(text, None)
+
+    def _dispatch_each(self, batch: list):
+        for text, future, _ in batch:
+            try:
+                future.set_result(self._embed([text])[0])
+            except Exception as e:
+                future.set_exception(e)
+
+
+_batchers: dict[str, EmbeddingBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def _get_batcher(model: str) -> EmbeddingBatcher:
+    with _batchers_lock:
+        if model not in _batchers:
+            _batchers[model] = EmbeddingBatcher(model)
+        return _batchers[model]
+
+
+def embed(text: str, model: str = EMBEDDING_MODEL) -> list[float]:
+    return _get_batcher(model).submit(text).result()
+
+
+def embed_many(texts: list[str], model: str = EMBEDDING_MODEL) -> list[list[float]]:
+    """Queue all texts at once so they share batches, then wait for them."""
+    batcher = _get_batcher(model)
+    futures = [batcher.submit(text) for text in texts]
+    return [future.result() for future in futures]
+
+
+async def aembed(text: str, model: str = EMBEDDING_MODEL) -> list[float]:
+    return await asyncio.wrap_future(_get_batcher(model).submit(text))
+
+
+# ─── Responses ────────────────────────────────────────────────────────────────
+
+
+def _response_tokens(kwargs: dict) -> int:
+    text = "".join(
+        m["content"] if isinstance(m, dict) else str(m)
+        for m in (
+            kwargs["input"] if isinstance(kwargs["input"], list) else [kwargs["input"]]
+        )
+    )
+    return estimate_tokens(text) + kwargs.get(
+        "max_output_tokens", DEFAULT_OUTPUT_RESERVE
+    )
+
+
+def create_response(coalesce: bool = False, **kwargs):
+    """client.responses.create with rate limiting and retries.
+
+    With coalesce=True, identical concurrent requests share one API call. Only
+    use it where identical inputs should get identical outputs.
+    """
+    model = kwargs["model"]
+    tokens = _response_tokens(kwargs)
+
+    def fn():
+        return _call(model, tokens, lambda: get_client().responses.create(**kwargs))
+
+    if coalesce:
+        return _coalesced(json.dumps(kwargs, sort_keys=True), fn)
+    return fn()
+
+
+async def acreate_response(coalesce: bool = False, **kwargs):
+    model = kwargs["model"]
+    tokens = _response_tokens(kwargs)
+
+    def fn():
+        return _acall(
+            model, tokens, lambda: get_async_client().responses.create(**kwargs)
+        )
+
+    if coalesce:
+        return await _acoalesced(json.dumps(kwargs, sort_keys=True), fn)
+    return await fn()
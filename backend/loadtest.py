@@ -0,0 +1,99 @@
+import argparse
+import asyncio
+import time
+
+import httpx
+
+
+def read_rss_kb(pid: int) -> tuple[int, int]:
+    """Current and peak resident set size (kB) of a local process, via /proc."""
+    current = peak = 0
+    with open(f"/proc/{pid}/status", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                current = int(line.split()[1])
+            elif line.startswith("VmHWM:"):
+                peak = int(line.split()[1])
+    return current, peak
+
+
+async def submit(client: httpx.AsyncClient, i: int, projects: list[str]) -> str | None:
+    resp = await client.post(
+        "/reports/generate",
+        json={
+            "title": f"loadtest-{i}",
+            # Distinct per request, or llm_client would coalesce them into one
+            "prompt": f"Resumen de actividades recientes, bloqueos y KPIs (#{i}).",
+            "files": projects,
+        },
+    )
+    if resp.status_code != 202:
+        return None
+    return resp.json().get("id")
+
+
+async def wait_for(client: httpx.AsyncClient, ids: set[str], poll: float, pid):
+    """Poll /reports/ until every submitted report leaves 'generating'."""
+    pending = set(ids)
+    statuses = {}
+    peak_rss = 0
+    while pending:
+        await asyncio.sleep(poll)
+        resp = await client.get("/reports/")
+        for report in resp.json():
+            if report["id"] in pending and report["status"] != "generating":
+                statuses[report["id"]] = report["status"]
+                pending.discard(report["id"])
+        if pid:
+            rss, _ = read_rss_kb(pid)
+            peak_rss = max(peak_rss, rss)
+        print(f"  {len(ids) - len(pending)}/{len(ids)} done", end="\r")
+    print()
+    return statuses, peak_rss
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Fire N concurrent briefing generations at a running backend."
+    )
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("-n", "--concurrency", type=int, default=1000)
+    parser.add_argument("--projects", nargs="*", default=["any"])
+    parser.add_argument("--poll", type=float, default=1.0)
+    parser.add_argument(
+        "--pid", type=int, help="Server PID to sample RSS from (Linux only)."
+    )
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(
+        base_url=args.url, limits=limits, timeout=None
+    ) as client:
+        rss_before = read_rss_kb(args.pid)[0] if args.pid else 0
+
+        start = time.perf_counter()
+        ids = await asyncio.gather(
+            *(submit(client, i, args.projects) for i in range(args.concurrency))
+        )
+        accepted = {report_id for report_id in ids if report_id}
+        submitted = time.perf_counter() - start
+        print(
+            f"Submitted {len(accepted)}/{args.concurrency} in {submitted:.2f}s "
+            f"({len(accepted) / submitted:.1f} req/s)"
+        )
+
+        statuses, peak_rss = await wait_for(client, accepted, args.poll, args.pid)
+        elapsed = time.perf_counter() - start
+
+    complete = sum(1 for s in statuses.values() if s == "complete")
+    print(f"Completed {complete}/{len(accepted)} generations in {elapsed:.2f}s")
+    print(f"Throughput: {complete / elapsed:.2f} generations/s")
+    if args.pid:
+        print(
+            f"Server RSS: {rss_before / 1024:.1f} MB before, "
+            f"{peak_rss / 1024:.1f} MB peak while generating"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,19 +1,22 @@
 import os
+import hashlib
 from typing import List, Optional
 import uuid
+import time
 import json
 import threading
+from concurrent.futures import ThreadPoolExecutor
 import sqlite3
 from datetime import datetime
 from dotenv import load_dotenv
 
-from openai import OpenAI
 from pinecone import Pinecone, ServerlessSpec, Vector
 from pypdf import PdfReader
 from docx import Document
 
 from tqdm import tqdm
 
+import llm_client
 from helpers import export_to_pdf
 from ragas import EvaluationDataset, SingleTurnSample, evaluate
 from ragas.metrics import (
@@ -28,15 +31,18 @@ load_dotenv()
 
 # ─── Configuration ─────────────────────────────────────────────────────────────
 
-openai = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 INDEX_NAME = "briefing-index-final"
 BASE_DIR = os.path.dirname(__file__)
 DB_PATH = os.path.join(BASE_DIR, "reports.db")
 
+# Set when running under several worker processes (gunicorn/hypercorn -w N).
+# Indexing and the job queue then run only on the elected leader; each worker
+# still generates the reports it accepts. See coordinator.py.
+MULTI_WORKER = os.getenv("MULTI_WORKER", "").lower() in ("1", "true", "yes")
+
 # ─── Embedding dimension ──────────────────────────────────────────────────────
-test_embedding = openai.embeddings.create(input="test", model="text-embedding-3-small")
-embedding_size = len(test_embedding.data[0].embedding)
+embedding_size = len(llm_client.embed("test"))
 print(f"Embedding size: {embedding_size}")
 
 # ─── Pinecone init ────────────────────────────────────────────────────────────
@@ -45,12 +51,17 @@ pc = Pinecone(api_key=PINECONE_API_KEY)
 print(pc.list_indexes().names())
 
 if INDEX_NAME not in pc.list_indexes().names():
-    pc.create_index(
-        name=INDEX_NAME,
-        dimension=embedding_size,
-        metric="cosine",
-        spec=ServerlessSpec(cloud="aws", region="us-east-1"),
-    )
+    try:
+        pc.create_index(
+            name=INDEX_NAME,
+            dimension=embedding_size,
+            metric="cosine",
+            spec=ServerlessSpec(cloud="aws", region="us-east-1"),
+        )
+    except Exception:
+        # Another worker may have created it concurrently
+        if INDEX_NAME not in pc.list_indexes().names():
+            raise
 
 
 def get_index():
@@ -62,8 +73,12 @@ def get_index():
 # Add a lock for thread-safe database operations
 db_lock = threading.RLock()
 
-conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+# db_lock only serializes threads of this process; across worker processes
+# SQLite's own locking applies, so wait on busy locks instead of failing.
+conn = sqlite3.connect(DB_PATH, check_same_thread=False, timeout=30)
 cur = conn.cursor()
+if MULTI_WORKER:
+    cur.execute("PRAGMA journal_mode=WAL")
 cur.execute(
     """
 CREATE TABLE IF NOT EXISTS reports (
@@ -92,6 +107,126 @@ CREATE TABLE IF NOT EXISTS indexed_files (
 )
 """
 )
+# Chunk text lives here, keyed by vector ID, instead of in vector metadata.
+cur.execute(
+    """
+CREATE TABLE IF NOT EXISTS chunks (
+    id TEXT PRIMARY KEY,
+    file_path TEXT,
+    project TEXT,
+    source TEXT,
+    chunk_index INTEGER,
+    start_offset INTEGER,
+    end_offset INTEGER,
+    text TEXT
+)
+"""
+)
+cur.execute("CREATE INDEX IF NOT EXISTS idx_chunks_file ON chunks (file_path)")
+indexed_files_columns = [
+    row[1] for row in cur.execute("PRAGMA table_info(indexed_files)")
+]
+if "file_hash" not in indexed_files_columns:
+    # Rows indexed before the chunk store have no hash and get re-indexed.
+    try:
+        cur.execute("ALTER TABLE indexed_files ADD COLUMN file_hash TEXT")
+    except sqlite3.OperationalError:
+        pass  # Added by another worker in the meantime
+# Background work shared between worker processes (see coordinator.py)
+cur.execute(
+    """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT,
+    payload TEXT,
+    status TEXT,
+    claimed_by TEXT,
+    claimed_until REAL,
+    attempts INTEGER DEFAULT 0,
+    error TEXT,
+    created_at REAL
+)
+"""
+)
+cur.execute(
+    """
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT,
+    expires_at REAL
+)
+"""
+)
+# Per-project digests: file summaries (map), cached merge parts (reduce) and
+# the resulting digest per project
+cur.execute(
+    """
+CREATE TABLE IF NOT EXISTS file_summaries (
+    file_path TEXT PRIMARY KEY,
+    project TEXT,
+    file_hash TEXT,
+    summary TEXT,
+    updated_at REAL
+)
+"""
+)
+cur.execute(
+    """
+CREATE TABLE IF NOT EXISTS digest_parts (
+    project TEXT,
+    level INTEGER,
+    part INTEGER,
+    input_hash TEXT,
+    text TEXT,
+    PRIMARY KEY (project, level, part)
+)
+"""
+)
+cur.execute(
+    """
+CREATE TABLE IF NOT EXISTS project_digests (
+    project TEXT PRIMARY KEY,
+    digest TEXT,
+    stale INTEGER,
+    updated_at REAL,
+    version INTEGER DEFAULT 0
+)
+"""
+)
+project_digests_columns = [
+    row[1] for row in cur.execute("PRAGMA table_info(project_digests)")
+]
+if "version" not in project_digests_columns:
+    try:
+        cur.execute("ALTER TABLE project_digests ADD COLUMN version INTEGER DEFAULT 0")
+    except sqlite3.OperationalError:
+        pass  # Added by another worker in the meantime
+# Cached listing of the uploads tree, maintained by catalog.py
+cur.execute(
+    """
+CREATE TABLE IF NOT EXISTS catalog (
+    rel_path TEXT PRIMARY KEY,
+    project TEXT,
+    is_dir INTEGER,
+    mtime REAL,
+    size INTEGER
+)
+"""
+)
+cur.execute(
+    """
+CREATE TABLE IF NOT EXISTS catalog_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER
+)
+"""
+)
+reports_columns = [row[1] for row in cur.execute("PRAGMA table_info(reports)")]
+if "digest_updated_at" not in reports_columns:
+    try:
+        cur.execute("ALTER TABLE reports ADD COLUMN digest_updated_at TEXT")
+    except sqlite3.OperationalError:
+        pass  # Added by another worker in the meantime
 conn.commit()
 
 
@@ -99,88 +234,212 @@ conn.commit()
 
 
 def embed_text(text: str) -> list[float]:
-    resp = openai.embeddings.create(input=text, model="text-embedding-3-small")
-    return resp.data[0].embedding
+    return llm_client.embed(text)
+
+
+def file_sha256(filepath: str) -> str:
+    h = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def vector_id_prefix(filepath: str) -> str:
+    """Stable per-file prefix for vector/chunk IDs.
+
+    Derived from the path relative to uploads, so same-named files in
+    different projects (or at the uploads root) never share IDs.
+    """
+    rel_path = os.path.relpath(filepath, os.path.join(BASE_DIR, "uploads"))
+    return hashlib.sha1(rel_path.encode("utf-8")).hexdigest()[:20]
+
+
+def extract_text(filepath: str) -> Optional[str]:
+    """Plain text of a PDF/DOCX/TXT/CSV/JSON file, or None if unsupported."""
+    if filepath.lower().endswith(".pdf"):
+        reader = PdfReader(filepath)
+        return "\n".join(page.extract_text() or "" for page in reader.pages)
+    elif filepath.lower().endswith(".docx"):
+        doc = Document(filepath)
+        return "\n".join(p.text for p in doc.paragraphs)
+    elif filepath.lower().endswith(".txt"):
+        with open(filepath, "r", encoding="utf-8") as f:
+            return f.read()
+    elif filepath.lower().endswith(".csv"):
+        with open(filepath, "r", encoding="utf-8") as f:
+            return f.read()
+    elif filepath.lower().endswith(".json"):
+        with open(filepath, "r", encoding="utf-8") as f:
+            return str(json.load(f))
+    return None
+
+
+def chunk_text(text: str) -> list[tuple[int, str]]:
+    """Split text into overlapping (start_offset, chunk) pairs."""
+    chunk_size = 500
+    overlap = 50
+    return [
+        (i, text[i : i + chunk_size]) for i in range(0, len(text), chunk_size - overlap)
+    ]
+
+
+def delete_file_chunks(filepath: str):
+    """Remove a file's vectors from Pinecone and its rows from the chunk store."""
+    with db_lock:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM chunks WHERE file_path = ?", (filepath,))
+        ids = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+
+    try:
+        index = get_index()
+        if ids:
+            for i in range(0, len(ids), 1000):
+                index.delete(ids=ids[i : i + 1000], namespace="main")
+        else:
+            # Vectors indexed before the chunk store: only reachable by
+            # filter, scoped to the project so same-named files survive
+            index.delete(
+                filter={
+                    "source": os.path.basename(filepath),
+                    "project": os.path.basename(os.path.dirname(filepath)),
+                },
+                namespace="main",
+            )
+    except Exception as e:
+        # Do nothing
+        pass
+
+    with db_lock:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM chunks WHERE file_path = ?", (filepath,))
+        conn.commit()
+        cursor.close()
+
+
+def remove_indexed_file(filepath: str):
+    """Forget a deleted file: its vectors, chunks, index row and summary."""
+    with db_lock:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT project FROM indexed_files WHERE file_path = ?", (filepath,)
+        )
+        row = cursor.fetchone()
+        cursor.close()
+
+    delete_file_chunks(filepath)
+
+    with db_lock:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM indexed_files WHERE file_path = ?", (filepath,))
+        cursor.execute("DELETE FROM file_summaries WHERE file_path = ?", (filepath,))
+        conn.commit()
+        cursor.close()
+    if row:
+        mark_digest_stale(row[0])
+
+
+def fetch_chunks(ids: list[str]) -> list[tuple[str, str]]:
+    """Hydrate query matches with their (project, chunk text) in one local
+    lookup.
+
+    Order follows `ids`; IDs missing from the store are dropped.
+    """
+    if not ids:
+        return []
+    placeholders = ",".join("?" * len(ids))
+    with db_lock:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT id, project, text FROM chunks WHERE id IN ({placeholders})", ids
+        )
+        chunks = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+        cursor.close()
+    return [chunks[i] for i in ids if i in chunks]
 
 
 def index_file(filepath: str, project: str, force: bool = False):
     """Parse PDF/DOCX/TXT, split & index into Pinecone."""
     try:
         # Get file's last modification time
-        file_mtime = os.path.getmtime(filepath)
+        file_mtime = int(os.path.getmtime(filepath))
 
         # Check if file has been indexed and hasn't changed
-        if not force:
+        with db_lock:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT last_modified, file_hash FROM indexed_files WHERE file_path = ?",
+                (filepath,),
+            )
+            result = cursor.fetchone()
+            cursor.close()
+        if not force and result and result[1] and result[0] == file_mtime:
+            return  # Skip indexing if file hasn't changed
+
+        # Only hash files whose mtime moved (or that predate the hash column)
+        file_hash = file_sha256(filepath)
+        if not force and result and result[1] == file_hash:
+            # Touched but not modified: just record the new mtime
             with db_lock:
                 cursor = conn.cursor()
                 cursor.execute(
-                    "SELECT last_modified FROM indexed_files WHERE file_path = ?",
-                    (filepath,),
+                    "UPDATE indexed_files SET last_modified = ? WHERE file_path = ?",
+                    (file_mtime, filepath),
                 )
-                result = cursor.fetchone()
+                conn.commit()
                 cursor.close()
-            if result and result[0] == int(file_mtime):
-                return  # Skip indexing if file hasn't changed
-
-        if filepath.lower().endswith(".pdf"):
-            reader = PdfReader(filepath)
-            text = "\n".join(page.extract_text() or "" for page in reader.pages)
-        elif filepath.lower().endswith(".docx"):
-            doc = Document(filepath)
-            text = "\n".join(p.text for p in doc.paragraphs)
-        elif filepath.lower().endswith(".txt"):
-            with open(filepath, "r", encoding="utf-8") as f:
-                text = f.read()
-        elif filepath.lower().endswith(".csv"):
-            with open(filepath, "r", encoding="utf-8") as f:
-                text = f.read()
-        elif filepath.lower().endswith(".json"):
-            with open(filepath, "r", encoding="utf-8") as f:
-                text = str(json.load(f))
-        else:
             return
 
-        chunk_size = 500
-        overlap = 50
-        chunks: List[str] = []
-        for i in range(0, len(text), chunk_size - overlap):
-            chunks.append(text[i : i + chunk_size])
+        text = extract_text(filepath)
+        if text is None:
+            return
 
         # First delete any existing vectors for this file
-        try:
-            index = get_index()
-            index.delete(
-                filter={"source": os.path.basename(filepath)}, namespace="main"
-            )
-        except Exception as e:
-            # Do nothing
-            pass
+        delete_file_chunks(filepath)
 
+        source = os.path.basename(filepath)
+        id_prefix = vector_id_prefix(filepath)
         vectors: List[Vector] = []
-        for i, chunk in enumerate(chunks):
-            emb = embed_text(chunk)
-            id = f"{os.path.basename(filepath)}-{i}"
-            meta = {
-                "source": os.path.basename(filepath),
-                "text": chunk,
-                "project": project,
-            }
+        rows = []
+        chunks = chunk_text(text)
+        embeddings = llm_client.embed_many([chunk for _, chunk in chunks])
+        for i, ((start, chunk), emb) in enumerate(zip(chunks, embeddings)):
+            id = f"{id_prefix}-{i}"
+            meta = {"source": source, "project": project}
             to_append = {"id": id, "values": emb, "metadata": meta}
             vectors.append(to_append)
+            rows.append(
+                (id, filepath, project, source, i, start, start + len(chunk), chunk)
+            )
 
+        index = get_index()
         index.upsert(vectors=vectors, namespace="main")
 
-        file_mtime = int(file_mtime)
         with db_lock:
             cursor = conn.cursor()
+            cursor.executemany(
+                """
+                INSERT OR REPLACE INTO chunks
+                (id, file_path, project, source, chunk_index, start_offset, end_offset, text)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
             cursor.execute(
-                "INSERT OR REPLACE INTO indexed_files (file_path, project, last_modified, last_indexed) VALUES (?, ?, ?, ?)",
-                (filepath, project, file_mtime, file_mtime),
+                "INSERT OR REPLACE INTO indexed_files (file_path, project, last_modified, last_indexed, file_hash) VALUES (?, ?, ?, ?, ?)",
+                (filepath, project, file_mtime, file_mtime, file_hash),
             )
             conn.commit()
             cursor.close()
+
     except Exception as e:
         print(f"Error indexing file {filepath}: {e}")
+        return
+
+    # Summarized by the next refresh_stale_digests (_backfill_summaries, in
+    # parallel), so bulk passes don't wait on one LLM call per file
+    mark_digest_stale(project)
 
 
 def index_all_files(force: bool = False):
@@ -190,44 +449,379 @@ def index_all_files(force: bool = False):
             files_to_index.append((root, file))
     for root, file in tqdm(files_to_index, desc="Indexing files"):
         index_file(os.path.join(root, file), os.path.basename(root), force)
+    refresh_stale_digests()
+
+
+def enqueue_job(
+    kind: str,
+    payload: dict,
+    claimed_by: Optional[str] = None,
+    claimed_until: Optional[float] = None,
+) -> int:
+    """Queue background work for the leader worker to pick up, or record work
+    a worker runs itself (claimed_by) so it can be recovered if that worker
+    dies."""
+    with db_lock:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            INSERT INTO jobs (kind, payload, status, claimed_by, claimed_until, attempts, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                kind,
+                json.dumps(payload),
+                "running" if claimed_by else "queued",
+                claimed_by,
+                claimed_until,
+                1 if claimed_by else 0,
+                time.time(),
+            ),
+        )
+        job_id = cursor.lastrowid
+        conn.commit()
+        cursor.close()
+    return job_id
+
+
+# ─── Project digests ──────────────────────────────────────────────────────────
+# Each indexed file is summarized once (map). Summaries are merged into a
+# project digest by repeated reduce passes over groups of DIGEST_FANOUT items;
+# every merged group is cached by a hash of its inputs, so a changed file only
+# re-merges the groups on its path to the root.
+
+DIGEST_MODEL = "gpt-4.1-mini"
+DIGEST_FANOUT = 20
+# Words of digest per briefing, shared by every project it covers
+DIGEST_BUDGET_WORDS = 600
+DIGEST_MIN_WORDS = 150
+DIGEST_WORKERS = 8
+SUMMARY_INPUT_CHARS = 12000
+
+DIGEST_SYSTEM_MSG = {
+    "role": "system",
+    "content": "Resumís documentación de proyectos de software para preparar briefings. Respondé en español, en viñetas breves, conservando nombres, fechas, KPIs y valores concretos. No inventes información.",
+}
+
+digest_lock = threading.Lock()
+
+
+def _digest_call(instructions: str, content: str) -> str:
+    resp = llm_client.create_response(
+        model=DIGEST_MODEL,
+        input=[
+            DIGEST_SYSTEM_MSG,
+            {"role": "user", "content": f"{instructions}\n\n{content}"},
+        ],
+        temperature=0,
+    )
+    return resp.output_text.strip()
+
+
+def mark_digest_stale(project: str):
+    """Flag a project's digest for rebuilding. The version bump tells a
+    refresh already in progress that its inputs changed under it."""
+    with db_lock:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            INSERT INTO project_digests (project, digest, stale, updated_at, version)
+            VALUES (?, '', 1, NULL, 1)
+            ON CONFLICT(project) DO UPDATE SET stale=1, version=version+1
+            """,
+            (project,),
+        )
+        conn.commit()
+        cursor.close()
+
+
+def summarize_file(filepath: str, project: str, file_hash: str, text: str):
+    """Map step: summarize one file and mark its project's digest stale."""
+    summary = _digest_call(
+        f"Resumí este documento del proyecto {project} en 5 a 10 viñetas: actividades recientes, problemas o bloqueos, interacciones con otros equipos, KPIs y tareas planificadas.",
+        text[:SUMMARY_INPUT_CHARS],
+    )
+    with db_lock:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT OR REPLACE INTO file_summaries (file_path, project, file_hash, summary, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (filepath, project, file_hash, summary, time.time()),
+        )
+        conn.commit()
+        cursor.close()
+    mark_digest_stale(project)
+
+
+def _file_text_from_chunks(filepath: str) -> str:
+    """Rebuild a file's text from its stored chunks (dropping the overlaps)."""
+    with db_lock:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT start_offset, text FROM chunks WHERE file_path = ? ORDER BY chunk_index",
+            (filepath,),
+        )
+        rows = cursor.fetchall()
+        cursor.close()
+    text = ""
+    for start, chunk in rows:
+        text += chunk[len(text) - start :]
+    return text
+
+
+def _backfill_summaries(project: str):
+    """Summarize indexed files without a current summary: newly (re)indexed
+    ones, or ones indexed before digests existed."""
+    with db_lock:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT f.file_path, f.file_hash FROM indexed_files f
+            LEFT JOIN file_summaries s ON s.file_path = f.file_path
+            WHERE f.project = ? AND f.file_hash IS NOT NULL
+            AND (s.file_hash IS NULL OR s.file_hash != f.file_hash)
+            """,
+            (project,),
+        )
+        missing = cursor.fetchall()
+        cursor.close()
+    with ThreadPoolExecutor(max_workers=DIGEST_WORKERS) as pool:
+        list(
+            pool.map(
+                lambda row: summarize_file(
+                    row[0], project, row[1], _file_text_from_chunks(row[0])
+                ),
+                missing,
+            )
+        )
 
 
-index_all_files()
-print("Indexing complete")
+def _reduce_level(
+    project: str, level: int, items: list[tuple[str, str]]
+) -> list[tuple[str, str]]:
+    """Merge (key, text) items into groups of ~DIGEST_FANOUT, reusing cached
+    groups whose inputs are unchanged."""
+    if level == 0:
+        # Files go to hash buckets so adding one doesn't shift the others.
+        # The bucket count is a power of two and only changes when it doubles.
+        n_parts = 1
+        while n_parts * DIGEST_FANOUT < len(items):
+            n_parts *= 2
+        groups = [[] for _ in range(n_parts)]
+        for key, text in items:
+            bucket = int(hashlib.sha1(key.encode()).hexdigest()[:8], 16) % n_parts
+            groups[bucket].append((key, text))
+    else:
+        groups = [
+            items[i : i + DIGEST_FANOUT] for i in range(0, len(items), DIGEST_FANOUT)
+        ]
 
-# ─── File utilities ────────────────────────────────────────────────────────────
+    with db_lock:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT part, input_hash, text FROM digest_parts WHERE project = ? AND level = ?",
+            (project, level),
+        )
+        cached = {part: (input_hash, text) for part, input_hash, text in cursor}
+        cursor.close()
+
+    def merge(part: int) -> str:
+        group = sorted(groups[part])
+        input_hash = hashlib.sha256(json.dumps(group).encode()).hexdigest()
+        if part in cached and cached[part][0] == input_hash:
+            return cached[part][1]
+        if not group:
+            text = ""
+        else:
+            text = _digest_call(
+                f"Combiná estos resúmenes del proyecto {project} en un único resumen consolidado con secciones: Actividades recientes, Problemas o bloqueos, Interacciones con otros equipos, KPIs y Tareas planificadas. Eliminá repeticiones y priorizá lo más reciente. Máximo 400 palabras.",
+                "\n\n---\n\n".join(text for _, text in group),
+            )
+        with db_lock:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT OR REPLACE INTO digest_parts (project, level, part, input_hash, text) VALUES (?, ?, ?, ?, ?)",
+                (project, level, part, input_hash, text),
+            )
+            conn.commit()
+            cursor.close()
+        return text
+
+    with ThreadPoolExecutor(max_workers=DIGEST_WORKERS) as pool:
+        texts = list(pool.map(merge, range(len(groups))))
+
+    with db_lock:
+        cursor = conn.cursor()
+        cursor.execute(
+            "DELETE FROM digest_parts WHERE project = ? AND level = ? AND part >= ?",
+            (project, level, len(groups)),
+        )
+        conn.commit()
+        cursor.close()
+    return [(f"{part:06d}", text) for part, text in enumerate(texts) if text]
 
 
-def list_available_files():
-    """Recursively walk through the uploads directory and return all files."""
-    upload_dir = os.path.join(BASE_DIR, "uploads")
-    os.makedirs(upload_dir, exist_ok=True)
+def refresh_digest(project: str):
+    with digest_lock:
+        _backfill_summaries(project)
+        with db_lock:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT version FROM project_digests WHERE project = ?", (project,)
+            )
+            row = cursor.fetchone()
+            version = row[0] if row else 0
+            cursor.execute(
+                "SELECT file_path, summary FROM file_summaries WHERE project = ?",
+                (project,),
+            )
+            # Keyed by path relative to backend/, so cached merges stay valid
+            # on nodes that load them from a snapshot
+            items = [
+                (os.path.relpath(file_path, BASE_DIR), summary)
+                for file_path, summary in cursor.fetchall()
+            ]
+            cursor.close()
 
-    files = []
-    for root, _, filenames in os.walk(upload_dir):
-        rel_path = os.path.relpath(root, upload_dir)
-        for filename in filenames:
-            if rel_path == ".":
-                files.append(filename)
-            else:
-                files.append(os.path.join(rel_path, filename))
+        if not items:
+            # No files left (e.g. the project directory was removed): drop
+            # its digest unless a file was summarized in the meantime
+            with db_lock:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "DELETE FROM project_digests WHERE project = ? AND version = ?",
+                    (project, version),
+                )
+                if cursor.rowcount:
+                    cursor.execute(
+                        "DELETE FROM digest_parts WHERE project = ?", (project,)
+                    )
+                conn.commit()
+                cursor.close()
+            return
 
-    return files
+        level = 0
+        while items and (level == 0 or len(items) > 1):
+            items = _reduce_level(project, level, items)
+            level += 1
+        digest = items[0][1] if items else ""
 
+        with db_lock:
+            cursor = conn.cursor()
+            # Stays stale if a summary changed since `version` was read
+            # (index_file and summarize_file run outside digest_lock)
+            cursor.execute(
+                """
+                INSERT INTO project_digests (project, digest, stale, updated_at, version)
+                VALUES (?, ?, 0, ?, ?)
+                ON CONFLICT(project) DO UPDATE
+                SET digest=excluded.digest, updated_at=excluded.updated_at,
+                    stale=(project_digests.version != excluded.version)
+                """,
+                (project, digest, time.time(), version),
+            )
+            conn.commit()
+            cursor.close()
 
-def list_projects():
-    """Return all subdirectories in the uploads directory."""
-    projects_dir = os.path.join(BASE_DIR, "uploads")
+
+def refresh_stale_digests():
+    """Rebuild digests of projects whose files changed since the last build."""
+    with db_lock:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT DISTINCT f.project FROM indexed_files f
+            LEFT JOIN project_digests d ON d.project = f.project
+            WHERE d.project IS NULL OR d.stale = 1
+            UNION
+            SELECT project FROM project_digests WHERE stale = 1
+            """
+        )
+        projects = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+    for project in projects:
+        try:
+            refresh_digest(project)
+        except Exception as e:
+            print(f"Error refreshing digest for {project}: {e}")
+
+
+def load_digests(projects: list[str]) -> list[tuple[str, str, float]]:
+    """(project, digest, updated_at) for the given projects, in that order."""
+    if not projects:
+        return []
+    placeholders = ",".join("?" * len(projects))
+    with db_lock:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT project, digest, updated_at FROM project_digests WHERE digest != '' AND project IN ({placeholders})",
+            projects,
+        )
+        rows = {row[0]: row for row in cursor.fetchall()}
+        cursor.close()
+    return [rows[p] for p in projects if p in rows]
+
+
+def _truncate_words(text: str, limit: int) -> str:
+    """First `limit` words of text, keeping its line structure."""
+    lines, words = [], 0
+    for line in text.splitlines():
+        n = len(line.split())
+        if words + n > limit:
+            if limit > words:
+                lines.append(" ".join(line.split()[: limit - words]) + " …")
+            break
+        lines.append(line)
+        words += n
+    return "\n".join(lines)
+
+
+def fit_digests(digests: list[tuple[str, str, float]]) -> list[tuple[str, str, float]]:
+    """Share DIGEST_BUDGET_WORDS among the digests, in order. Each gets at
+    least DIGEST_MIN_WORDS, so with many projects only the first ones fit."""
+    n = min(len(digests), DIGEST_BUDGET_WORDS // DIGEST_MIN_WORDS)
+    if not n:
+        return []
+    share = DIGEST_BUDGET_WORDS // n
     return [
-        name
-        for name in os.listdir(projects_dir)
-        if os.path.isdir(os.path.join(projects_dir, name))
+        (project, _truncate_words(digest, share), updated_at)
+        for project, digest, updated_at in digests[:n]
     ]
 
 
 # ─── RAGAS evaluation ────────────────────────────────────────────────────────
 
 
+# RAGAS calls OpenAI itself; reserve rate-limit budget for it up front
+RAGAS_MODEL = "gpt-4o-mini"
+RAGAS_METRICS = [
+    LLMContextPrecisionWithoutReference(),
+    # context_recall, # No trabajamos con reference
+    answer_relevancy,
+    faithfulness,
+]
+
+
+def save_ragas_scores(report_id: str, scores: dict):
+    with db_lock:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            UPDATE reports
+            SET context_precision=?, context_recall=?, answer_relevancy=?, faithfulness=?
+            WHERE id=?
+            """,
+            (
+                str(scores["llm_context_precision_without_reference"]),
+                "",
+                str(scores["answer_relevancy"]),
+                str(scores["faithfulness"]),
+                report_id,
+            ),
+        )
+        conn.commit()
+        cursor.close()
+
+
 def run_ragas_eval(
     report_id: str,
     user_instructions: str,
@@ -241,40 +835,17 @@ def run_ragas_eval(
             response=result,
         )
         dataset = EvaluationDataset([ragas_sample])
-        ragas_result = evaluate(
-            dataset,
-            metrics=[
-                LLMContextPrecisionWithoutReference(),
-                # context_recall, # No trabajamos con reference
-                answer_relevancy,
-                faithfulness,
-            ],
+        llm_client.reserve(
+            RAGAS_MODEL,
+            requests=len(RAGAS_METRICS),
+            tokens=llm_client.estimate_tokens(user_instructions + result)
+            * len(RAGAS_METRICS),
         )
+        ragas_result = evaluate(dataset, metrics=RAGAS_METRICS)
         print(ragas_result.scores)
         print(ragas_result.scores[0]["llm_context_precision_without_reference"])
 
-        with db_lock:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                UPDATE reports
-                SET context_precision=?, context_recall=?, answer_relevancy=?, faithfulness=?
-                WHERE id=?
-                """,
-                (
-                    str(
-                        ragas_result.scores[0][
-                            "llm_context_precision_without_reference"
-                        ]
-                    ),
-                    "",
-                    str(ragas_result.scores[0]["answer_relevancy"]),
-                    str(ragas_result.scores[0]["faithfulness"]),
-                    report_id,
-                ),
-            )
-            conn.commit()
-            cursor.close()
+        save_ragas_scores(report_id, ragas_result.scores[0])
     except Exception as e:
         print(f"Error running RAGAS evaluation: {e}")
 
@@ -282,7 +853,14 @@ def run_ragas_eval(
 # ─── Briefing generation ──────────────────────────────────────────────────────
 
 
-def generate_briefing(report_id: str, projects: list[str]):
+SYSTEM_MSG = {
+    "role": "system",
+    "content": "Sos un asistente que genera briefings para distintos equipos de trabajo. El briefing debe ser en español, con formato markdown. Es muy importante unicamente incluir la información relevante y real para el equipo en cuestión.",
+}
+
+
+def load_report_request(report_id: str) -> Optional[tuple[str, list[str]]]:
+    """Return the stored (prompt, projects) for a report, or None."""
     with db_lock:
         cursor = conn.cursor()
         cursor.execute("SELECT prompt, projects FROM reports WHERE id=?", (report_id,))
@@ -290,39 +868,33 @@ def generate_briefing(report_id: str, projects: list[str]):
         cursor.close()
 
     if not row:
-        return
+        return None
     prompt, projects_json = row
-    projects = json.loads(projects_json)
+    return prompt, json.loads(projects_json)
 
-    try:
-        query_emb = embed_text(prompt)
 
-        index = get_index()
-        if "any" in projects:
-            query_resp = index.query(
-                include_values=True,
-                include_metadata=True,
-                vector=query_emb,
-                top_k=15,
-                namespace="main",
-            )
-        else:
-            query_resp = index.query(
-                include_values=True,
-                include_metadata=True,
-                vector=query_emb,
-                top_k=15,
-                filter={"project": {"$in": projects}},
-                namespace="main",
-            )
-        contexts = [match["metadata"]["text"] for match in query_resp["matches"]]
-        context = "\n\n".join(contexts) if contexts else ""
+# Chunks retrieved per briefing; only the first few are kept when project
+# digests cover the rest
+TOP_K = 15
+TOP_K_WITH_DIGEST = 5
+
+
+def build_query(query_emb: list[float], projects: list[str], top_k: int) -> dict:
+    """Keyword arguments for the briefing retrieval query."""
+    query = {
+        "include_values": False,
+        "include_metadata": False,
+        "vector": query_emb,
+        "top_k": top_k,
+        "namespace": "main",
+    }
+    if "any" not in projects:
+        query["filter"] = {"project": {"$in": projects}}
+    return query
+
 
-        system_msg = {
-            "role": "system",
-            "content": "Sos un asistente que genera briefings para distintos equipos de trabajo. El briefing debe ser en español, con formato markdown. Es muy importante unicamente incluir la información relevante y real para el equipo en cuestión.",
-        }
-        user_instructions = f"""
+def build_user_instructions(prompt: str, context: str) -> str:
+    return f"""
             Genera un briefing con secciones usando markdown:
             # Briefing: <Titulo del reporte>
             
@@ -351,9 +923,105 @@ def generate_briefing(report_id: str, projects: list[str]):
             {context}
         """.strip()
 
-        chat_resp = openai.responses.create(
+
+def build_contexts(
+    digests: list[tuple[str, str, float]], chunks: list[str]
+) -> list[str]:
+    """Project digests first, then the retrieved chunks."""
+    return [
+        f"Resumen del proyecto {project}:\n{digest}" for project, digest, _ in digests
+    ] + chunks
+
+
+def select_contexts(
+    projects: list[str], chunks: list[tuple[str, str]]
+) -> tuple[list[tuple[str, str, float]], list[str]]:
+    """Digests and contexts for a briefing, from its top TOP_K (project, text)
+    matches.
+
+    Digests are ranked by the project's best match; with 'any' only projects
+    that matched are included. Returns (digests used, contexts).
+    """
+    ranked = list(dict.fromkeys(project for project, _ in chunks))
+    if "any" not in projects:
+        ranked += [p for p in projects if p not in ranked]
+    digests = fit_digests(load_digests(ranked))
+    top_k = TOP_K_WITH_DIGEST if digests else TOP_K
+    return digests, build_contexts(digests, [text for _, text in chunks[:top_k]])
+
+
+def digest_freshness(digests: list[tuple[str, str, float]]) -> Optional[str]:
+    """Build time of the oldest digest used, if any."""
+    if not digests:
+        return None
+    return datetime.utcfromtimestamp(min(d[2] for d in digests)).isoformat()
+
+
+def save_briefing(report_id: str, result: str, digest_updated_at: Optional[str] = None):
+    """Write the briefing to disk (TXT + PDF) and mark the report complete."""
+    out_dir = os.path.join(BASE_DIR, "reports")
+    os.makedirs(out_dir, exist_ok=True)
+
+    txt_outfile = os.path.join(out_dir, f"{report_id}.txt")
+    with open(txt_outfile, "w", encoding="utf-8") as f:
+        f.write(result)
+
+    pdf_outfile = os.path.join(out_dir, f"{report_id}.pdf")
+    export_to_pdf(result, pdf_outfile)
+
+    title = result.split("Briefing: ")[1].split("\n")[0]
+
+    with db_lock:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            UPDATE reports
+            SET status='complete', download_path=?, title=?, digest_updated_at=?
+            WHERE id=?
+        """,
+            (pdf_outfile, title, digest_updated_at, report_id),
+        )
+        conn.commit()
+        cursor.close()
+
+
+def mark_report_failed(report_id: str, e: Exception):
+    with db_lock:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            UPDATE reports
+            SET status='failed', error=?
+            WHERE id=?
+        """,
+            (str(e), report_id),
+        )
+        conn.commit()
+        cursor.close()
+    print(f"Error generating report {report_id}: {e}")
+
+
+def generate_briefing(report_id: str, projects: list[str]):
+    request = load_report_request(report_id)
+    if not request:
+        return
+    prompt, projects = request
+
+    try:
+        query_emb = embed_text(prompt)
+
+        index = get_index()
+        query_resp = index.query(**build_query(query_emb, projects, TOP_K))
+        chunks = fetch_chunks([match["id"] for match in query_resp["matches"]])
+        digests, contexts = select_contexts(projects, chunks)
+        context = "\n\n".join(contexts) if contexts else ""
+
+        user_instructions = build_user_instructions(prompt, context)
+
+        chat_resp = llm_client.create_response(
+            coalesce=True,
             model="gpt-4.1",
-            input=[system_msg, {"role": "user", "content": user_instructions}],
+            input=[SYSTEM_MSG, {"role": "user", "content": user_instructions}],
             temperature=0.3,
         )
         result = chat_resp.output_text.strip()
@@ -364,80 +1032,60 @@ def generate_briefing(report_id: str, projects: list[str]):
             daemon=True,
         ).start()
 
-        out_dir = os.path.join(BASE_DIR, "reports")
-        os.makedirs(out_dir, exist_ok=True)
+        save_briefing(report_id, result, digest_freshness(digests))
 
-        txt_outfile = os.path.join(out_dir, f"{report_id}.txt")
-        with open(txt_outfile, "w", encoding="utf-8") as f:
-            f.write(result)
+    except Exception as e:
+        mark_report_failed(report_id, e)
 
-        pdf_outfile = os.path.join(out_dir, f"{report_id}.pdf")
-        export_to_pdf(result, pdf_outfile)
 
-        title = result.split("Briefing: ")[1].split("\n")[0]
+# ─── Report-management API ────────────────────────────────────────────────────
 
-        with db_lock:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                UPDATE reports
-                SET status='complete', download_path=?, title=?
-                WHERE id=?
-            """,
-                (pdf_outfile, title, report_id),
-            )
-            conn.commit()
-            cursor.close()
 
-    except Exception as e:
-        with db_lock:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                UPDATE reports
-                SET status='failed', error=?
-                WHERE id=?
-            """,
-                (str(e), report_id),
-            )
-            conn.commit()
-            cursor.close()
-        print(f"Error generating report {report_id}: {e}")
+def insert_report(title: str, prompt: str, projects: list[str]) -> dict:
+    """Insert a new report row in 'generating' state and return it."""
+    report_id = str(uuid.uuid4())
+    now = datetime.utcnow().isoformat()
 
+    with db_lock:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            INSERT INTO reports
+            (id, title, prompt, projects, createdAt, status)
+            VALUES (?, ?, ?, ?, ?, 'generating')
+        """,
+            (report_id, title, prompt, json.dumps(projects), now),
+        )
+        conn.commit()
+        cursor.close()
 
-# ─── Report-management API ────────────────────────────────────────────────────
+    return {
+        "id": report_id,
+        "title": title,
+        "prompt": prompt,
+        "projects": projects,
+        "createdAt": now,
+        "status": "generating",
+    }
 
 
 def create_report(title: str, prompt: str, projects: list[str]) -> dict:
+    """Insert the report row and, with a single worker, start generating it.
+
+    In multi-worker mode the caller runs it on this worker as a claimed job
+    (coordinator.run_local), so the leader can recover it if this one dies.
+    """
     try:
-        report_id = str(uuid.uuid4())
-        now = datetime.utcnow().isoformat()
+        report = insert_report(title, prompt, projects)
 
-        with db_lock:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                INSERT INTO reports
-                (id, title, prompt, projects, createdAt, status)
-                VALUES (?, ?, ?, ?, ?, 'generating')
-            """,
-                (report_id, title, prompt, json.dumps(projects), now),
+        if not MULTI_WORKER:
+            thread = threading.Thread(
+                target=generate_briefing, args=(report["id"], projects)
             )
-            conn.commit()
-            cursor.close()
+            thread.daemon = True
+            thread.start()
 
-        thread = threading.Thread(target=generate_briefing, args=(report_id, projects))
-        thread.daemon = True
-        thread.start()
-
-        return {
-            "id": report_id,
-            "title": title,
-            "prompt": prompt,
-            "projects": projects,
-            "createdAt": now,
-            "status": "generating",
-        }
+        return report
     except Exception as e:
         print(f"Error creating report: {e}")
         return {"error": str(e)}
@@ -466,6 +1114,7 @@ def list_reports() -> list[dict]:
                 "contextRecall": r[9] if r[9] else None,
                 "answerRelevancy": r[10] if r[10] else None,
                 "faithfulness": r[11] if r[11] else None,
+                "digestUpdatedAt": r[12] if r[12] else None,
             }
         )
     return result
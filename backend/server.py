@@ -1,14 +1,16 @@
 import os
+import atexit
 from flask import Flask, request, jsonify, send_file
 from flask_cors import CORS
 
+import coordinator
+from catalog import list_available_files, list_projects
+import llm_client
 from rag import (
-    list_available_files,
-    index_file,
+    MULTI_WORKER,
     create_report,
     list_reports,
     get_report_path,
-    list_projects,
 )
 
 app = Flask(__name__)
@@ -17,16 +19,33 @@ CORS(app)
 UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "uploads")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# With MULTI_WORKER set, each gunicorn worker must import this module after
+# forking (don't use --preload).
+# `python server.py` runs the debug reloader, which executes this module in a
+# parent that only watches the sources and again in the child that serves
+# (WERKZEUG_RUN_MAIN): only the child may watch and index uploads.
+if __name__ != "__main__" or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+    coordinator.start()
+    atexit.register(coordinator.coordinator.stop)
+
+
+def cached_json(data, etag: str):
+    """JSON response with an ETag; 304 if the client already has it."""
+    if request.headers.get("If-None-Match") == etag:
+        return "", 304, {"ETag": etag}
+    return jsonify(data), 200, {"ETag": etag}
+
 
 @app.route("/files/available", methods=["GET"])
 def available_files():
-    files = list_available_files()
-    return jsonify(files), 200
+    files, etag = list_available_files()
+    return cached_json(files, etag)
 
 
 @app.route("/projects/available", methods=["GET"])
 def available_projects():
-    return jsonify(list_projects()), 200
+    projects, etag = list_projects()
+    return cached_json(projects, etag)
 
 
 @app.route("/files/upload", methods=["POST"])
@@ -38,8 +57,8 @@ def upload_file():
         return jsonify({"error": "no filename"}), 400
 
     save_path = os.path.join(UPLOAD_DIR, f.filename)
+    # Indexed by the uploads watcher (catalog.py) once the write settles
     f.save(save_path)
-    index_file(save_path)
     return jsonify({"filename": f.filename}), 200
 
 
@@ -58,9 +77,16 @@ def generate_report_endpoint():
         return jsonify({"error": "invalid payload"}), 400
 
     report = create_report(title, prompt, files)
+    if "id" in report and MULTI_WORKER:
+        coordinator.coordinator.run_local("report", {"report_id": report["id"]})
     return jsonify(report), 202
 
 
+@app.route("/stats/llm", methods=["GET"])
+def llm_stats():
+    return jsonify(llm_client.get_stats()), 200
+
+
 @app.route("/reports/download/<report_id>", methods=["GET"])
 def download_report(report_id):
     path = get_report_path(report_id)
@@ -0,0 +1,117 @@
+import os
+import asyncio
+from quart import Quart, request, jsonify, send_file
+from quart_cors import cors
+
+import async_rag
+import coordinator
+from catalog import list_available_files, list_projects
+import llm_client
+from rag import (
+    MULTI_WORKER,
+    list_reports,
+    get_report_path,
+)
+
+# ASGI counterpart of server.py: same routes, but briefings run as coroutines
+# on the event loop instead of one OS thread each. SQLite access (guarded by
+# rag.db_lock) always goes through asyncio.to_thread.
+#   hypercorn server_async:app --bind 0.0.0.0:8000
+app = cors(Quart(__name__))
+
+UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "uploads")
+os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+
+@app.before_serving
+async def startup():
+    await async_rag.startup()
+    # Indexing runs in a background thread: startup must finish within
+    # hypercorn's startup_timeout, and requests are served meanwhile
+    coordinator.start()
+
+
+@app.after_serving
+async def shutdown():
+    coordinator.coordinator.stop()
+    await async_rag.shutdown()
+
+
+def cached_json(data, etag: str):
+    """JSON response with an ETag; 304 if the client already has it."""
+    if request.headers.get("If-None-Match") == etag:
+        return "", 304, {"ETag": etag}
+    return jsonify(data), 200, {"ETag": etag}
+
+
+@app.route("/files/available", methods=["GET"])
+async def available_files():
+    files, etag = await asyncio.to_thread(list_available_files)
+    return cached_json(files, etag)
+
+
+@app.route("/projects/available", methods=["GET"])
+async def available_projects():
+    projects, etag = await asyncio.to_thread(list_projects)
+    return cached_json(projects, etag)
+
+
+@app.route("/files/upload", methods=["POST"])
+async def upload_file():
+    files = await request.files
+    if "file" not in files:
+        return jsonify({"error": "no file part"}), 400
+    f = files["file"]
+    if f.filename == "":
+        return jsonify({"error": "no filename"}), 400
+
+    save_path = os.path.join(UPLOAD_DIR, f.filename)
+    # Indexed by the uploads watcher (catalog.py) once the write settles
+    await f.save(save_path)
+    return jsonify({"filename": f.filename}), 200
+
+
+@app.route("/reports/", methods=["GET"])
+async def get_reports():
+    return jsonify(await asyncio.to_thread(list_reports)), 200
+
+
+@app.route("/reports/generate", methods=["POST"])
+async def generate_report_endpoint():
+    data = await request.get_json() or {}
+    title = data.get("title")
+    prompt = data.get("prompt")
+    files = data.get("files", [])
+    if not title or not prompt or not isinstance(files, list):
+        return jsonify({"error": "invalid payload"}), 400
+
+    report = await async_rag.create_report(title, prompt, files)
+    if "id" in report and MULTI_WORKER:
+        # Claimed before replying, so the leader re-runs it if this worker dies
+        job_id = await asyncio.to_thread(
+            coordinator.claim_local_job, "report", {"report_id": report["id"]}
+        )
+        app.add_background_task(async_rag.run_local_briefing, report["id"], job_id)
+    elif "id" in report:
+        app.add_background_task(async_rag.generate_briefing, report["id"])
+    return jsonify(report), 202
+
+
+@app.route("/stats/llm", methods=["GET"])
+async def llm_stats():
+    return jsonify(llm_client.get_stats()), 200
+
+
+@app.route("/reports/download/<report_id>", methods=["GET"])
+async def download_report(report_id):
+    path = await asyncio.to_thread(get_report_path, report_id)
+    if not path or not os.path.exists(path):
+        return jsonify({"error": "report not ready or not found"}), 404
+
+    return await send_file(
+        path, as_attachment=True, attachment_filename=f"{report_id}.txt"
+    )
+
+
+if __name__ == "__main__":
+    app.run(host="0.0.0.0", port=8000)
@@ -0,0 +1,405 @@
+import io
+import os
+import json
+import time
+import zipfile
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from tqdm import tqdm
+
+import llm_client
+import rag
+from rag import BASE_DIR, conn, db_lock
+
+# ─── Configuration ─────────────────────────────────────────────────────────────
+
+SNAPSHOT_VERSION = 2
+READABLE_VERSIONS = (1, 2)  # version 1 has no digest tables
+FETCH_BATCH = 100  # IDs per Pinecone fetch (sent in the URL)
+UPSERT_BATCH = 200  # ~1.2 MB per request at 1536 float dims
+UPSERT_WORKERS = 8
+HASH_WORKERS = 8
+DELETE_BATCH = 1000  # Pinecone's limit on IDs per delete
+
+# A snapshot is a zip with:
+#   manifest.json       version, model, dimension, dtype, counts
+#   indexed_files.json  indexed_files rows (paths relative to backend/)
+#   chunks.jsonl        one chunk per line, in embedding row order
+#   embeddings.npy      (n_chunks, dimension) float16/float32
+#   file_summaries.json, digest_parts.json, project_digests.json
+#                       digest state, so an import doesn't re-summarize
+
+
+def _relpath(path: str) -> str:
+    return os.path.relpath(path, BASE_DIR)
+
+
+def _abspath(path: str) -> str:
+    return os.path.join(BASE_DIR, path)
+
+
+# ─── Export ───────────────────────────────────────────────────────────────────
+
+
+def export_snapshot(out_path: str, dtype: str = "float16"):
+    with db_lock:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT file_path, project, last_modified, last_indexed, file_hash FROM indexed_files WHERE file_hash IS NOT NULL"
+        )
+        files = cursor.fetchall()
+        cursor.execute(
+            """
+            SELECT id, file_path, project, source, chunk_index, start_offset, end_offset, text
+            FROM chunks ORDER BY file_path, chunk_index
+            """
+        )
+        chunks = cursor.fetchall()
+        cursor.execute(
+            """
+            SELECT s.file_path, s.project, s.file_hash, s.summary, s.updated_at
+            FROM file_summaries s
+            JOIN indexed_files f ON f.file_path = s.file_path AND f.file_hash = s.file_hash
+            """
+        )
+        summaries = cursor.fetchall()
+        cursor.execute(
+            "SELECT project, level, part, input_hash, text FROM digest_parts"
+        )
+        parts = cursor.fetchall()
+        cursor.execute("SELECT project, digest, updated_at FROM project_digests")
+        digests = cursor.fetchall()
+        cursor.close()
+
+    index = rag.get_index()
+    embeddings = np.zeros((len(chunks), rag.embedding_size), dtype=dtype)
+    missing = set()
+    for start in tqdm(range(0, len(chunks), FETCH_BATCH), desc="Fetching vectors"):
+        batch = chunks[start : start + FETCH_BATCH]
+        resp = index.fetch(ids=[c[0] for c in batch], namespace="main")
+        for row, chunk in enumerate(batch, start):
+            vector = resp.vectors.get(chunk[0])
+            if vector is None:
+                missing.add(chunk[1])
+            else:
+                embeddings[row] = vector.values
+
+    # Files with a vector missing remotely are left out; they re-index on import
+    keep = [i for i, c in enumerate(chunks) if c[1] not in missing]
+    files = [f for f in files if f[0] not in missing]
+    summaries = [s for s in summaries if s[0] not in missing]
+    chunks = [chunks[i] for i in keep]
+    embeddings = embeddings[keep]
+
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "createdAt": time.time(),
+        "model": llm_client.EMBEDDING_MODEL,
+        "dimension": rag.embedding_size,
+        "dtype": dtype,
+        "files": len(files),
+        "chunks": len(chunks),
+        "summaries": len(summaries),
+    }
+    buffer = io.BytesIO()
+    np.save(buffer, embeddings)
+
+    with zipfile.ZipFile(out_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("manifest.json", json.dumps(manifest, indent=2))
+        zf.writestr(
+            "indexed_files.json",
+            json.dumps(
+                [
+                    {
+                        "file_path": _relpath(f[0]),
+                        "project": f[1],
+                        "last_modified": f[2],
+                        "last_indexed": f[3],
+                        "file_hash": f[4],
+                    }
+                    for f in files
+                ]
+            ),
+        )
+        with zf.open("chunks.jsonl", "w") as f:
+            for c in chunks:
+                record = {
+                    "id": c[0],
+                    "file_path": _relpath(c[1]),
+                    "project": c[2],
+                    "source": c[3],
+                    "chunk_index": c[4],
+                    "start_offset": c[5],
+                    "end_offset": c[6],
+                    "text": c[7],
+                }
+                f.write((json.dumps(record) + "\n").encode("utf-8"))
+        zf.writestr(
+            "file_summaries.json",
+            json.dumps(
+                [
+                    {
+                        "file_path": _relpath(s[0]),
+                        "project": s[1],
+                        "file_hash": s[2],
+                        "summary": s[3],
+                        "updated_at": s[4],
+                    }
+                    for s in summaries
+                ]
+            ),
+        )
+        zf.writestr(
+            "digest_parts.json",
+            json.dumps(
+                [
+                    {
+                        "project": p[0],
+                        "level": p[1],
+                        "part": p[2],
+                        "input_hash": p[3],
+                        "text": p[4],
+                    }
+                    for p in parts
+                ]
+            ),
+        )
+        zf.writestr(
+            "project_digests.json",
+            json.dumps(
+                [{"project": d[0], "digest": d[1], "updated_at": d[2]} for d in digests]
+            ),
+        )
+        # Already compact; deflating float data gains little
+        zf.writestr(
+            "embeddings.npy", buffer.getvalue(), compress_type=zipfile.ZIP_STORED
+        )
+
+    print(
+        f"Exported {len(files)} files / {len(chunks)} chunks to {out_path}"
+        + (f" ({len(missing)} files skipped: vectors missing)" if missing else "")
+    )
+
+
+# ─── Import ───────────────────────────────────────────────────────────────────
+
+
+def _file_status(entry: dict, indexed: dict) -> str:
+    """'current': already indexed locally; 'load': local file's sha256
+    matches the snapshot; 'stale': missing or changed, left to the regular
+    index pass."""
+    path = _abspath(entry["file_path"])
+    if not os.path.exists(path):
+        return "stale"
+    mtime = int(os.path.getmtime(path))
+    local = indexed.get(path)
+    if local and local[1] == entry["file_hash"] and local[0] == mtime:
+        return "current"
+    # Always hashed: a matching mtime alone doesn't prove the same content,
+    # and index_file would then trust the loaded chunks until the next edit
+    if rag.file_sha256(path) == entry["file_hash"]:
+        return "load"
+    return "stale"
+
+
+def _delete_local_chunks(paths: set[str], keep_ids: set[str], index):
+    """Drop this node's chunks for `paths`: their store rows, and in batched
+    deletes the vectors the snapshot won't overwrite."""
+    with db_lock:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, file_path FROM chunks")
+        local = [row for row in cursor.fetchall() if row[1] in paths]
+        cursor.executemany("DELETE FROM chunks WHERE id = ?", [(i,) for i, _ in local])
+        conn.commit()
+        cursor.close()
+    stale_ids = [i for i, _ in local if i not in keep_ids]
+    for start in range(0, len(stale_ids), DELETE_BATCH):
+        index.delete(ids=stale_ids[start : start + DELETE_BATCH], namespace="main")
+
+
+def import_snapshot(in_path: str):
+    with zipfile.ZipFile(in_path) as zf:
+        manifest = json.loads(zf.read("manifest.json"))
+        if manifest["version"] not in READABLE_VERSIONS:
+            raise ValueError(f"unsupported snapshot version {manifest['version']}")
+        if (
+            manifest["model"] != llm_client.EMBEDDING_MODEL
+            or manifest["dimension"] != rag.embedding_size
+        ):
+            raise ValueError(
+                f"snapshot embeddings ({manifest['model']}, {manifest['dimension']}) "
+                f"don't match this node ({llm_client.EMBEDDING_MODEL}, {rag.embedding_size})"
+            )
+        files = json.loads(zf.read("indexed_files.json"))
+        chunks = [json.loads(line) for line in zf.read("chunks.jsonl").splitlines()]
+        embeddings = np.load(io.BytesIO(zf.read("embeddings.npy")))
+        if manifest["version"] >= 2:
+            summaries = json.loads(zf.read("file_summaries.json"))
+            parts = json.loads(zf.read("digest_parts.json"))
+            digests = json.loads(zf.read("project_digests.json"))
+        else:
+            summaries, parts, digests = [], [], []
+
+    with db_lock:
+        cursor = conn.cursor()
+        cursor.execute("SELECT file_path, last_modified, file_hash FROM indexed_files")
+        indexed = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+        cursor.close()
+
+    # hashlib releases the GIL, so files are hashed in parallel
+    with ThreadPoolExecutor(max_workers=HASH_WORKERS) as pool:
+        statuses = dict(
+            zip(
+                (f["file_path"] for f in files),
+                pool.map(lambda f: _file_status(f, indexed), files),
+            )
+        )
+    to_load = {path for path, status in statuses.items() if status == "load"}
+    rows = [i for i, c in enumerate(chunks) if c["file_path"] in to_load]
+    hashes = {f["file_path"]: f["file_hash"] for f in files}
+    summaries = [
+        s
+        for s in summaries
+        if s["file_path"] in to_load and s["file_hash"] == hashes[s["file_path"]]
+    ]
+    projects = {f["project"] for f in files if f["file_path"] in to_load}
+
+    index = rag.get_index()
+    # Vector IDs are deterministic, so the upsert overwrites this node's
+    # vectors for those files; only leftover IDs need deleting
+    _delete_local_chunks(
+        {_abspath(path) for path in to_load}, {chunks[i]["id"] for i in rows}, index
+    )
+    vectors = embeddings[rows].astype(np.float32)
+
+    def upsert(start: int):
+        index.upsert(
+            vectors=[
+                {
+                    "id": chunks[i]["id"],
+                    "values": vectors[j].tolist(),
+                    "metadata": {
+                        "source": chunks[i]["source"],
+                        "project": chunks[i]["project"],
+                    },
+                }
+                for j, i in enumerate(rows[start : start + UPSERT_BATCH], start)
+            ],
+            namespace="main",
+        )
+
+    with ThreadPoolExecutor(max_workers=UPSERT_WORKERS) as pool:
+        list(
+            tqdm(
+                pool.map(upsert, range(0, len(rows), UPSERT_BATCH)),
+                total=-(-len(rows) // UPSERT_BATCH),
+                desc="Upserting vectors",
+            )
+        )
+
+    with db_lock:
+        cursor = conn.cursor()
+        cursor.executemany(
+            """
+            INSERT OR REPLACE INTO chunks
+            (id, file_path, project, source, chunk_index, start_offset, end_offset, text)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    chunks[i]["id"],
+                    _abspath(chunks[i]["file_path"]),
+                    chunks[i]["project"],
+                    chunks[i]["source"],
+                    chunks[i]["chunk_index"],
+                    chunks[i]["start_offset"],
+                    chunks[i]["end_offset"],
+                    chunks[i]["text"],
+                )
+                for i in rows
+            ],
+        )
+        # Record the local mtime so index_all_files treats these as current
+        cursor.executemany(
+            "INSERT OR REPLACE INTO indexed_files (file_path, project, last_modified, last_indexed, file_hash) VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    _abspath(f["file_path"]),
+                    f["project"],
+                    int(os.path.getmtime(_abspath(f["file_path"]))),
+                    f["last_indexed"],
+                    f["file_hash"],
+                )
+                for f in files
+                if f["file_path"] in to_load
+            ],
+        )
+        cursor.executemany(
+            "INSERT OR REPLACE INTO file_summaries (file_path, project, file_hash, summary, updated_at) VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    _abspath(s["file_path"]),
+                    s["project"],
+                    s["file_hash"],
+                    s["summary"],
+                    s["updated_at"],
+                )
+                for s in summaries
+            ],
+        )
+        # Cached merges are keyed by their input hash, so they're only reused
+        # where this node's summaries match the snapshot's
+        cursor.executemany(
+            "INSERT OR REPLACE INTO digest_parts (project, level, part, input_hash, text) VALUES (?, ?, ?, ?, ?)",
+            [
+                (p["project"], p["level"], p["part"], p["input_hash"], p["text"])
+                for p in parts
+                if p["project"] in projects
+            ],
+        )
+        # Usable right away; left stale so the next refresh checks them
+        # against this node's files (no LLM calls if nothing differs)
+        cursor.executemany(
+            """
+            INSERT INTO project_digests (project, digest, stale, updated_at, version)
+            VALUES (?, ?, 1, ?, 1)
+            ON CONFLICT(project) DO UPDATE
+            SET digest=excluded.digest, stale=1, updated_at=excluded.updated_at,
+                version=version+1
+            """,
+            [
+                (d["project"], d["digest"], d["updated_at"])
+                for d in digests
+                if d["project"] in projects
+            ],
+        )
+        conn.commit()
+        cursor.close()
+
+    counts = {s: list(statuses.values()).count(s) for s in ("load", "current", "stale")}
+    print(
+        f"Imported {counts['load']} files / {len(rows)} chunks / "
+        f"{len(summaries)} summaries; "
+        f"{counts['current']} already current, {counts['stale']} missing or changed "
+        "(indexed on next startup)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index snapshot export/import.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_cmd = commands.add_parser("export-snapshot")
+    export_cmd.add_argument("path")
+    export_cmd.add_argument(
+        "--dtype", choices=["float16", "float32"], default="float16"
+    )
+    import_cmd = commands.add_parser("import-snapshot")
+    import_cmd.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "export-snapshot":
+        export_snapshot(args.path, args.dtype)
+    else:
+        import_snapshot(args.path)
@@ -112,6 +112,7 @@ export function ReportDetail({ report, onDownload }: ReportDetailProps) {
           <p>Context Precision: {report.contextPrecision || "N/A"}</p>
           <p>Answer Relevancy: {report.answerRelevancy || "N/A"}</p>
           <p>Faithfulness: {report.faithfulness || "N/A"}</p>
+          <p>Project Digest Updated: {report.digestUpdatedAt || "N/A"}</p>
         </CardContent>
       </Card>
 
@@ -11,6 +11,7 @@ export interface Report {
   contextRecall?: string;
   answerRelevancy?: string;
   faithfulness?: string;
+  digestUpdatedAt?: string;
 }
 
 export type ReportStatus = "generating" | "complete" | "failed";
@@ -2,4 +2,4 @@
 source .venv/bin/activate
 
 # Run generator
-python backend/generator.py
\ No newline at end of file
+python backend/generator.py "$@"
\ No newline at end of file
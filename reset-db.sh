@@ -1,5 +1,6 @@
 # Remove backend/reports.db
 rm backend/reports.db
+rm -f backend/reports.db-wal backend/reports.db-shm
 
 # Remove backend/uploads
 rm -rf backend/uploads
@@ -0,0 +1,5 @@
+# Activate virtual environment
+source .venv/bin/activate
+
+# Run backend (ASGI)
+cd backend && hypercorn server_async:app --bind 0.0.0.0:8000